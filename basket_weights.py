@@ -0,0 +1,128 @@
+"""
+Implied basket weights of the official and custom indices.
+
+The log-return of each index is regressed on the currency log-returns over rolling
+windows, with the weights constrained to be non-negative and to sum to one (a free
+intercept absorbs drift). Every window reduces to a small quadratic programme in its
+centred normal equations
+
+    minimise 1/2 w'Gw - b'w  subject to  w >= 0, sum(w) = 1
+
+which is solved for a whole batch of windows, and every index, at once by accelerated
+projected gradient (FISTA) with a vectorised projection onto the simplex. Batches of
+windows are spread over the process's long-lived pool (jobs.process_pool) once there are
+enough of them to pay for the round trips.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from jobs import PROCESSES, process_pool
+
+BATCH_SIZE = 256
+#below this many windows (well under a second of solving for 20 indices on 40 currencies)
+#the round trips to the pool are not worth it
+PARALLEL_MIN_WINDOWS = 2048
+MAX_ITER = 3000
+TOL = 1e-8
+
+
+def project_simplex(v):
+    """Euclidean projection of each column v[i, :, j] onto the probability simplex. v: (w, k, m)."""
+    k = v.shape[1]
+    u = -np.sort(-v, axis=1)
+    css = np.cumsum(u, axis=1) - 1.0
+    steps = np.arange(1, k + 1)[None, :, None]
+    #rho is the last position where the sorted value stays above the running threshold
+    rho = k - 1 - np.argmax((u - css / steps > 0)[:, ::-1, :], axis=1)
+    theta = np.take_along_axis(css, rho[:, None, :], axis=1) / (rho[:, None, :] + 1)
+    return np.maximum(v - theta, 0.0)
+
+
+def solve_batch(gram, xty, max_iter=MAX_ITER, tol=TOL):
+    """
+    Simplex-constrained least squares for a batch of windows.
+
+    gram: (w, k, k) centred X'X per window, xty: (w, k, m) centred X'y per window and index.
+    Returns weights of shape (w, k, m). Windows with non-finite statistics are NaN.
+    """
+    w, k, m = xty.shape
+    weights = np.full((w, k, m), np.nan)
+    ok = np.isfinite(gram).all(axis=(1, 2)) & np.isfinite(xty).all(axis=(1, 2))
+    if not ok.any():
+        return weights
+    gram, xty = gram[ok], xty[ok]
+
+    #step 1/L with L the largest eigenvalue of each window's Gram matrix
+    lipschitz = np.linalg.eigvalsh(gram)[:, -1]
+    step = (1.0 / np.where(lipschitz > 0, lipschitz, 1.0))[:, None, None]
+    x = np.full(xty.shape, 1.0 / k)
+    z, t = x, np.ones((len(x), 1, 1))
+    solved = np.empty_like(x)
+    #windows leave the batch as they converge, ill-conditioned ones should not hold back the rest
+    active = np.arange(len(x))
+    for _ in range(max_iter):
+        x_new = project_simplex(z - step * (gram @ z - xty))
+        t_new = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        z = x_new + ((t - 1.0) / t_new) * (x_new - x)
+        done = np.abs(x_new - x).max(axis=(1, 2)) < tol
+        x, t = x_new, t_new
+        if done.any():
+            solved[active[done]] = x[done]
+            keep = ~done
+            active, x, z, t, step, gram, xty = active[keep], x[keep], z[keep], t[keep], step[keep], gram[keep], xty[keep]
+            if not len(active):
+                break
+    solved[active] = x
+    weights[ok] = solved
+    return weights
+
+
+def rolling_statistics(X, Y, window):
+    """Centred X'X (w, k, k) and X'y (w, k, m) of every trailing window of `window` rows."""
+    Xw = sliding_window_view(X, window, axis=0)
+    Yw = sliding_window_view(Y, window, axis=0)
+    Xw = Xw - Xw.mean(axis=2, keepdims=True)
+    Yw = Yw - Yw.mean(axis=2, keepdims=True)
+    return np.einsum('ikt,ilt->ikl', Xw, Xw), np.einsum('ikt,imt->ikm', Xw, Yw)
+
+
+def solve_windows(gram, xty, processes=PROCESSES, batch_size=BATCH_SIZE):
+    """solve_batch over all windows, split into batches of batch_size on a process pool when worthwhile."""
+    n = len(gram)
+    if processes <= 1 or n < PARALLEL_MIN_WINDOWS:
+        return solve_batch(gram, xty)
+    starts = range(0, n, batch_size)
+    #the process's long-lived pool, the one background jobs run on
+    batches = process_pool(processes).map(solve_batch, [gram[i:i + batch_size] for i in starts], [xty[i:i + batch_size] for i in starts])
+    return np.concatenate(list(batches))
+
+
+def implied_weights(frame, y_columns, x_columns, window=52, processes=PROCESSES, date_column='Average for Week Ending'):
+    """
+    Rolling implied weights of each y column (index log-returns) on x_columns (currency
+    log-returns). Each y column uses the rows where it and every x column are present;
+    y columns with the same missing-value pattern share their windows and are solved together.
+
+    Returns {y column: DataFrame}, indexed by the date of the last observation in each
+    window, one column per currency, each row summing to one.
+    """
+    y_columns = list(y_columns)
+    frame = frame.dropna(subset=[date_column, *x_columns]).sort_values(date_column)
+    X_all = frame[list(x_columns)].to_numpy(dtype=float)
+    Y_all = frame[y_columns].to_numpy(dtype=float)
+    dates_all = frame[date_column].to_numpy()
+
+    result = {}
+    patterns, group = np.unique(~np.isnan(Y_all).T, axis=0, return_inverse=True)
+    for g, pattern in enumerate(patterns):
+        cols = np.flatnonzero(group.ravel() == g)
+        dates = dates_all[pattern]
+        if len(dates) < window:
+            weights = np.empty((0, len(x_columns), len(cols)))
+        else:
+            weights = solve_windows(*rolling_statistics(X_all[pattern], Y_all[pattern][:, cols], window), processes=processes)
+        index = pd.Index(dates[len(dates) - len(weights):], name=date_column)
+        for j, col in enumerate(cols):
+            result[y_columns[col]] = pd.DataFrame(weights[:, :, j], index=index, columns=list(x_columns))
+    return {col: result[col] for col in y_columns}
@@ -0,0 +1,234 @@
+"""
+Benchmark harness for the dashboard at production scale.
+
+Generates synthetic inputs (see synthetic.py, cached under benchmarks/data), then times
+the data load (cold from Excel and warm from the columnar cache), app and layout
+construction, cache warming and the main callbacks through the Flask test client, and
+measures the serialized payload bytes the browser receives.
+
+Every run appends one JSON line to benchmarks/results.jsonl with the git revision, the
+host and the scale, and is compared with a baseline: the median of each metric over the
+last --baseline-runs passing runs at the same scale on the same host. Timings more than
+--tolerance and more than --noise-floor seconds slower (or payloads larger) are reported
+and make the run exit with status 1; such a run is recorded as failed and never becomes
+part of the baseline, so a regression cannot be accepted by running again. Until there are
+--baseline-runs passing runs the comparison is only reported, so that one fast run cannot
+lock the baseline.
+
+    python benchmarks/run.py                      # 15 years daily x 40 currencies x 20 indices
+    python benchmarks/run.py --years 3 --currencies 6 --indices 2 --freq W
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+warnings.filterwarnings('ignore', message='.*package is deprecated')
+
+import data_store  # noqa: E402
+import synthetic  # noqa: E402
+from dashboard_data import DashboardData  # noqa: E402
+from sgdneer_app import create_app  # noqa: E402
+
+RESULTS = os.path.join(HERE, 'results.jsonl')
+#metrics compared between runs, bigger is worse for all of them
+TRACKED = (
+    'load_cold_s', 'load_warm_s', 'create_app_s', 'warm_all_s',
+    'update_content_cold_s', 'update_content_warm_s', 'comparison_s', 'deviation_s', 'table_page_s',
+    'layout_bytes', 'update_content_bytes', 'comparison_bytes', 'deviation_bytes', 'table_page_bytes',
+)
+#slowdowns of cache-hit timings this small are scheduling noise, not regressions
+NOISE_FLOOR_S = 0.01
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        elapsed, result = timed(fn)
+        times.append(elapsed)
+    return statistics.median(times), result
+
+
+def post_callback(client, outputs, inputs, state=(), changed=None):
+    """POST one callback request the way the Dash renderer does, return the response body."""
+    def spec(prop):
+        component, prop = prop.split('.')
+        return {'id': component, 'property': prop}
+
+    body = {
+        'output': outputs[0] if len(outputs) == 1 else '..' + '...'.join(outputs) + '..',
+        'outputs': spec(outputs[0]) if len(outputs) == 1 else [spec(o) for o in outputs],
+        'inputs': [{**spec(prop), 'value': value} for prop, value in inputs],
+        'state': [{**spec(prop), 'value': value} for prop, value in state],
+        'changedPropIds': changed or [inputs[0][0]],
+    }
+    response = client.post('/_dash-update-component', json=body)
+    if response.status_code != 200:
+        raise RuntimeError(f'{outputs} returned {response.status_code}')
+    return response.data
+
+
+def run(args):
+    data_dir = os.path.join(HERE, 'data', f'{args.years:g}y-{args.freq}-{args.currencies}c-{args.indices}i-s{args.seed}')
+    currency_file = os.path.join(data_dir, 'currency_merged.xlsx')
+    index_file = os.path.join(data_dir, 'df.xlsx')
+    if not os.path.exists(index_file):
+        print(f'generating {data_dir}', file=sys.stderr)
+        synthetic.write(data_dir, years=args.years, n_currencies=args.currencies, n_indices=args.indices, freq=args.freq, seed=args.seed)
+
+    cache_dirs = []
+
+    def load_cold():
+        #every cold load parses the workbooks into an empty cache, the last one is kept for the warm runs
+        cache_dirs.append(tempfile.mkdtemp(prefix='sgdneer-bench-'))
+        data_store.CACHE_DIR = cache_dirs[-1]
+        return DashboardData(currency_file, index_file)
+
+    try:
+        metrics = {}
+        metrics['load_cold_s'], _ = median_time(load_cold, args.repeat)
+        metrics['load_warm_s'], data = median_time(lambda: DashboardData(currency_file, index_file), args.repeat)
+
+        metrics['create_app_s'], app = timed(create_app, data, warm=None)
+        client = app.server.test_client()
+        metrics['layout_bytes'] = len(client.get('/_dash-layout').data)
+
+        content_outputs = [
+            'tracking-error.children', 'ols-summary.children', 'tracking-error-plot.figure', 'deviation-comment.children',
+            'tracking-error-comment.children', 'ols-comment.children', 'conclusion.children',
+        ]
+
+        def update_content(name):
+            return post_callback(client, content_outputs, [
+                ('deviation-dropdown.value', name), ('tracking-window-dropdown.value', 'M'), ('data-version.data', None),
+            ])
+
+        cold = [timed(update_content, name)[0] for name in data.indices]
+        metrics['update_content_cold_s'] = statistics.median(cold)
+        metrics['update_content_warm_s'], payload = median_time(lambda: update_content(data.indices[-1]), args.repeat)
+        metrics['update_content_bytes'] = len(payload)
+
+        metrics['warm_all_s'], _ = timed(DashboardData(currency_file, index_file).warm)
+
+        metrics['comparison_s'], payload = median_time(lambda: post_callback(client, ['comparison-plot.figure'], [
+            ('data-version.data', None), ('comparison-plot.relayoutData', None),
+        ]), args.repeat)
+        metrics['comparison_bytes'] = len(payload)
+
+        metrics['deviation_s'], payload = median_time(lambda: post_callback(client, ['interactive-plot.figure'], [
+            ('deviation-dropdown.value', data.indices[0]), ('data-version.data', None), ('interactive-plot.relayoutData', None),
+        ]), args.repeat)
+        metrics['deviation_bytes'] = len(payload)
+
+        metrics['table_page_s'], payload = median_time(lambda: post_callback(client, ['tracking-table.data', 'tracking-table.page_count'], [
+            ('tracking-table.page_current', 3), ('tracking-table.page_size', 20),
+            ('tracking-table.sort_by', [{'column_id': 'Official', 'direction': 'desc'}]), ('tracking-table.filter_query', ''),
+            ('data-version.data', None),
+        ]), args.repeat)
+        metrics['table_page_bytes'] = len(payload)
+        return metrics, {'rows': len(data.df), 'index_rows': len(data.df_full)}
+    finally:
+        for cache_dir in cache_dirs:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def host_info():
+    """The machine a run was measured on, runs are only compared on the same one."""
+    return {'node': platform.node(), 'machine': platform.machine(), 'python': platform.python_version(), 'cpus': os.cpu_count()}
+
+
+def baseline(scale, host, runs):
+    """Median of each metric over the last `runs` passing runs at scale on host, None if there are none."""
+    if not os.path.exists(RESULTS):
+        return None
+    passing = []
+    with open(RESULTS) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry['scale'] == scale and entry.get('host') == host and entry.get('passed'):
+                passing.append(entry['metrics'])
+    passing = passing[-runs:]
+    if not passing:
+        return None
+    return {
+        'runs': len(passing),
+        'metrics': {name: statistics.median(m[name] for m in passing) for name in TRACKED if all(name in m for m in passing)},
+    }
+
+
+def compare(metrics, baseline, tolerance, noise_floor=NOISE_FLOOR_S):
+    """
+    Print each tracked metric against baseline, return the names that regressed. Timings
+    only regress when they are also more than noise_floor seconds slower.
+    """
+    regressed = []
+    if baseline:
+        print(f"baseline: median of the last {baseline['runs']} passing runs")
+    print(f"{'metric':<26}{'current':>14}{'baseline':>14}{'change':>10}")
+    for name in TRACKED:
+        current, before = metrics[name], (baseline or {}).get('metrics', {}).get(name)
+        change = '' if not before else f'{current / before - 1:+.0%}'
+        flag = ''
+        floor = noise_floor if name.endswith('_s') else 0
+        if before and current > before * (1 + tolerance) and current - before > floor:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        fmt = '{:>14.4f}' if name.endswith('_s') else '{:>14.0f}'
+        print(f'{name:<26}' + fmt.format(current) + (fmt.format(before) if before else f"{'-':>14}") + f'{change:>10}{flag}')
+    return regressed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the SGDNEER dashboard on synthetic data.')
+    parser.add_argument('--years', type=float, default=15)
+    parser.add_argument('--currencies', type=int, default=40)
+    parser.add_argument('--indices', type=int, default=20)
+    parser.add_argument('--freq', default='D')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='repetitions of the load and warm measurements, the median is kept')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before a metric counts as regressed')
+    parser.add_argument('--noise-floor', type=float, default=NOISE_FLOOR_S, help='seconds a timing has to slow down by to count as regressed')
+    parser.add_argument('--baseline-runs', type=int, default=5, help='passing runs whose median is the baseline')
+    parser.add_argument('--no-record', action='store_true', help='do not append this run to results.jsonl')
+    args = parser.parse_args()
+
+    scale = {'years': args.years, 'freq': args.freq, 'currencies': args.currencies, 'indices': args.indices, 'seed': args.seed}
+    metrics, sizes = run(args)
+    host = host_info()
+    reference = baseline(scale, host, args.baseline_runs)
+    regressed = compare(metrics, reference, args.tolerance, args.noise_floor)
+    #a baseline of one or two runs is as noisy as a single run, it is only enforced once complete
+    if regressed and reference['runs'] < args.baseline_runs:
+        print(f"baseline has {reference['runs']} of {args.baseline_runs} runs, regressions are not enforced yet")
+        regressed = []
+
+    if not args.no_record:
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'revision': git_revision(), 'host': host, 'scale': scale,
+            **sizes, 'metrics': metrics, 'passed': not regressed,
+        }
+        with open(RESULTS, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+    sys.exit(1 if regressed else 0)
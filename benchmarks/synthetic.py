@@ -0,0 +1,83 @@
+"""
+Synthetic currency_merged.xlsx / df.xlsx shaped data at configurable scale.
+
+The official index is a fixed-weight geometric basket of the currency returns,
+each custom index a basket with perturbed weights plus noise, so deviations,
+tracking errors and regressions behave like the real inputs.
+
+    python benchmarks/synthetic.py --years 15 --currencies 40 --indices 20 --out benchmarks/data/large
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dashboard_data import CURRENCIES  # noqa: E402
+from index_registry import INDEX_REGISTRY  # noqa: E402
+
+DATE_COLUMN = 'Average for Week Ending'
+
+
+def currency_names(n):
+    names = CURRENCIES[:n]
+    return names + [f'C{i:02d}' for i in range(len(names), n)]
+
+
+def index_names(n):
+    names = list(INDEX_REGISTRY)[:n]
+    return names + [f'IDX{i:02d}SGD' for i in range(len(names), n)]
+
+
+def generate(years=15, n_currencies=40, n_indices=20, freq='D', start='2010-01-01', seed=0):
+    """Return (currency_merged, df) frames covering `years` of `freq` observations."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=int(years * {'D': 365.25, 'B': 261, 'W': 52.18}[freq[0]]), freq=freq)
+    n = len(dates)
+    currencies = currency_names(n_currencies)
+    indices = index_names(n_indices)
+
+    returns = rng.normal(0, 0.004, (n, n_currencies))
+    weights = rng.dirichlet(np.ones(n_currencies))
+    official_returns = returns @ weights
+    index_weights = np.abs(weights[:, None] + rng.normal(0, 0.2 * weights.mean(), (n_currencies, n_indices)))
+    index_weights /= index_weights.sum(axis=0)
+    index_returns = returns @ index_weights + rng.normal(0, 0.0005, (n, n_indices))
+
+    official = 100 * np.exp(np.cumsum(official_returns))
+    levels = 100 * np.exp(np.cumsum(index_returns, axis=0))
+    official_pct = np.concatenate([[np.nan], official[1:] / official[:-1] - 1])
+    levels_pct = np.vstack([np.full(n_indices, np.nan), levels[1:] / levels[:-1] - 1])
+
+    df_full = pd.DataFrame({DATE_COLUMN: dates, 'Official': official, **dict(zip(indices, levels.T))})
+    currency_merged = pd.concat([
+        df_full,
+        pd.DataFrame(official_pct[:, None] - levels_pct, columns=[f'Deviation {name}' for name in indices]),
+        pd.DataFrame(returns, columns=currencies),
+    ], axis=1).iloc[1:].reset_index(drop=True)
+    return currency_merged, df_full
+
+
+def write(out, **kwargs):
+    """Write currency_merged.xlsx and df.xlsx into directory out, return their paths."""
+    os.makedirs(out, exist_ok=True)
+    currency_merged, df_full = generate(**kwargs)
+    paths = os.path.join(out, 'currency_merged.xlsx'), os.path.join(out, 'df.xlsx')
+    currency_merged.to_excel(paths[0], index=False)
+    df_full.to_excel(paths[1], index=False)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic dashboard inputs.')
+    parser.add_argument('--years', type=float, default=15)
+    parser.add_argument('--currencies', type=int, default=40)
+    parser.add_argument('--indices', type=int, default=20)
+    parser.add_argument('--freq', default='D')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='benchmarks/data/large')
+    args = parser.parse_args()
+    print(*write(args.out, years=args.years, n_currencies=args.currencies, n_indices=args.indices, freq=args.freq, seed=args.seed))
@@ -0,0 +1,89 @@
+"""
+Moving-block bootstrap of the tracking error and the deviation regression of one index.
+
+Deviations are autocorrelated, so rows are resampled in blocks of consecutive
+observations rather than one at a time. Each call to replicate draws a batch of
+resamples as one index array and evaluates all of them at once: standard deviations
+along the resample axis for the tracking error, batched normal equations for the
+regression. summarize turns the replicates of all batches into percentile intervals.
+"""
+import numpy as np
+import pandas as pd
+
+N_BOOT = 1000
+BATCH = 50
+ALPHA = 0.05
+
+
+def block_length(n):
+    """Default block length, n^(1/3) observations."""
+    return max(int(round(n ** (1 / 3))), 1)
+
+
+def block_indices(n, block, n_boot, rng):
+    """(n_boot, n) row indices of moving-block resamples of n rows."""
+    n_blocks = -(-n // block)
+    starts = rng.integers(0, n - block + 1, size=(n_boot, n_blocks))
+    return (starts[:, :, None] + np.arange(block)).reshape(n_boot, -1)[:, :n]
+
+
+def replicate(deviation, X, y, block, n_boot, seed):
+    """
+    n_boot bootstrap replicates of the tracking error (population std, as the reported
+    estimate, see tracking_error.py) of deviation (1-D, no NaN) and of the
+    OLS coefficients of y on X (X includes the constant column, rows without NaN).
+    Returns (tracking errors (n_boot,), params (n_boot, k)).
+    """
+    rng = np.random.default_rng(seed)
+    tracking_errors = deviation[block_indices(len(deviation), block, n_boot, rng)].std(axis=1)
+
+    idx = block_indices(len(y), block, n_boot, rng)
+    Xb, yb = X[idx], y[idx]
+    xtx = np.einsum('bnk,bnl->bkl', Xb, Xb)
+    xty = np.einsum('bnk,bn->bk', Xb, yb)
+    #a resample can repeat a block often enough to be singular, those replicates are NaN
+    params = np.full(xty.shape, np.nan)
+    ok = np.linalg.matrix_rank(xtx) == X.shape[1]
+    params[ok] = np.linalg.solve(xtx[ok], xty[ok][:, :, None])[:, :, 0]
+    return tracking_errors, params
+
+
+def tasks(frame, y_column, x_columns, n_boot=N_BOOT, batch=BATCH, block=None, seed=0):
+    """
+    Arguments of the replicate calls for one index, n_boot replicates in batches of batch.
+    Seeds are spawned from seed so the result does not depend on how batches are scheduled.
+    """
+    deviation = frame[y_column].dropna().to_numpy(dtype=float)
+    rows = frame.dropna(subset=[y_column, *x_columns])
+    X = np.column_stack([np.ones(len(rows)), rows[list(x_columns)].to_numpy(dtype=float)])
+    y = rows[y_column].to_numpy(dtype=float)
+    block = block or block_length(len(y))
+    sizes = [min(batch, n_boot - start) for start in range(0, n_boot, batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return [(deviation, X, y, block, size, s) for size, s in zip(sizes, seeds)]
+
+
+def summarize(parts, estimate_te, estimate_params, regressors, block, alpha=ALPHA):
+    """
+    Percentile intervals from the replicate batches.
+
+    Returns {'tracking_error': {'estimate', 'low', 'high'}, 'params': DataFrame with one row
+    per regressor and columns estimate, low, high, p_value, 'n_boot': replicates used,
+    'block': block length}.
+    The p-value is the two-sided share of replicates on the other side of zero.
+    """
+    tracking_errors = np.concatenate([part[0] for part in parts])
+    params = np.concatenate([part[1] for part in parts])
+    params = params[~np.isnan(params).any(axis=1)]
+    q = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+    te_low, te_high = np.percentile(tracking_errors, q)
+    low, high = np.percentile(params, q, axis=0)
+    p_value = np.minimum(2 * np.minimum((params <= 0).mean(axis=0), (params >= 0).mean(axis=0)), 1.0)
+    return {
+        'tracking_error': {'estimate': estimate_te, 'low': te_low, 'high': te_high},
+        'params': pd.DataFrame(
+            {'estimate': estimate_params, 'low': low, 'high': high, 'p_value': p_value}, index=regressors
+        ),
+        'n_boot': len(params),
+        'block': block,
+    }
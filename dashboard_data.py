@@ -0,0 +1,468 @@
+"""
+Data, fitted models and result caches behind the dashboard.
+
+DashboardData loads both workbooks once (through the columnar cache in data_store),
+derives everything the callbacks need and holds the per-index result caches.
+sgdneer_app.create_app builds the Dash app around one instance; in production it is
+created in the WSGI master before the workers fork, so every worker shares it
+read-only through copy-on-write instead of loading its own copy.
+"""
+import functools
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import basket_weights
+import bootstrap
+import data_store
+import downsample
+import index_registry
+import jobs
+import metrics
+import regression
+import tracking_error as te
+from result_cache import ResultCache
+
+CURRENCY_FILE = os.environ.get('SGDNEER_CURRENCY_FILE', 'currency_merged.xlsx')
+INDEX_FILE = os.environ.get('SGDNEER_INDEX_FILE', 'df.xlsx')
+CURRENCIES = ['USD', 'EUR', 'JPY', 'CNY', 'MYR', 'IDR']
+TABLE_COLUMNS = ['Average for Week Ending', 'Official']
+
+
+class DashboardData:
+    def __init__(self, currency_file=CURRENCY_FILE, index_file=INDEX_FILE, currencies=CURRENCIES):
+        self.currency_file = currency_file
+        self.index_file = index_file
+        self.currencies = list(currencies)
+        self._lock = threading.Lock()
+
+        #inputs are parsed once into a memory-mapped columnar cache, dates come back as datetime64
+        with metrics.span('startup.load'):
+            df, self.df_version = data_store.load_frame(currency_file)
+            df_full, self.df_full_version = data_store.load_frame(index_file)
+
+        #rows ingested since the workbooks were cached (see ingest.py), folded in later by refresh
+        with metrics.span('startup.load_appends'):
+            df_chunks = data_store.load_appends(currency_file, self.df_version)
+            df_full_chunks = data_store.load_appends(index_file, self.df_full_version)
+            #a chunk can complete rows of dates already there, see data_store.combine_dates
+            if df_chunks:
+                df = data_store.combine_dates(pd.concat([df, *df_chunks], ignore_index=True))
+            if df_full_chunks:
+                df_full = data_store.combine_dates(pd.concat([df_full, *df_full_chunks], ignore_index=True))
+        self.applied_chunks = [len(df_chunks), len(df_full_chunks)]
+        self.version = (self.df_version, self.df_full_version, tuple(self.applied_chunks))
+
+        #indices come from the registry and the columns present in the data, deviations are derived from levels where missing
+        self.indices = index_registry.discover_indices(df, df_full)
+        self.deviation_columns = [f'Deviation {name}' for name in self.indices]
+        self.derived_columns = [col for col in self.deviation_columns if col not in df.columns]
+        self.level_indices = [name for name in self.indices if name in df_full.columns]
+        self.table_columns = [*TABLE_COLUMNS, *self.level_indices]
+        #series whose basket weights can be implied, they need index levels
+        self.weight_series = [index_registry.OFFICIAL_COLUMN, *self.level_indices]
+        with metrics.span('startup.deviations'):
+            self.df = index_registry.add_deviations(df, self.indices, df_full)
+            self.df_full = df_full
+            self.merged_clean = self.df.dropna(subset=['Average for Week Ending']).dropna(subset=self.deviation_columns, how='all')
+
+        #overall tracking errors, all indices in one pass, kept as running moments so new rows update them
+        with metrics.span('startup.tracking_errors'):
+            self.tracking_moments = te.StreamingMoments(self.deviation_columns)
+            self.tracking_moments.update(self.merged_clean[self.deviation_columns])
+            self.tracking_errors = dict(zip(self.indices, np.round(self.tracking_moments.std(), 6)))
+
+        #tracking table source, formatted once so paging/sorting/filtering only slices it
+        with metrics.span('startup.table'):
+            self.table_frame = self.format_table_rows(df_full)
+
+        #OLS, every index fitted against the shared currency design matrix in one least-squares solve.
+        #the sufficient statistics are kept as well so ingested rows refresh the fits in O(k^2) per row
+        with metrics.span('startup.ols'):
+            self.ols_fit = regression.fit_ols(self.df, self.deviation_columns, self.currencies)
+            self.ols_state = regression.OLSAccumulator(self.deviation_columns, self.currencies)
+            self.ols_state.update(self.df)
+
+        #per-index results keyed by index name and input-data version, warmed so a dropdown switch is a lookup
+        size = 4 * len(self.indices)
+        self.index_results = ResultCache(self.compute_index_results, version=self.version, maxsize=size)
+        self.tracking_results = ResultCache(self.compute_tracking_error, version=self.version, maxsize=size)
+        self.ols_paths = ResultCache(self.compute_ols_paths, version=self.version)
+        self.ols_path_results = ResultCache(self.compute_ols_path_figures, version=self.version, maxsize=size)
+        self.comparison_results = ResultCache(self.build_comparison_figure, version=self.version, maxsize=1)
+        self.basket_weights = ResultCache(self.compute_basket_weights, version=self.version, maxsize=4)
+        self.basket_weight_results = ResultCache(self.compute_basket_weight_figures, version=self.version, maxsize=size + 4)
+        #bootstrap intervals take seconds, they run as background jobs keyed like the caches
+        self.bootstrap_jobs = jobs.JobRunner()
+        self.caches = {
+            'index_results': self.index_results,
+            'tracking_results': self.tracking_results,
+            'ols_paths': self.ols_paths,
+            'ols_path_results': self.ols_path_results,
+            'comparison_results': self.comparison_results,
+            'basket_weights': self.basket_weights,
+            'basket_weight_results': self.basket_weight_results,
+        }
+
+    def warm(self, names=None):
+        """Fill the caches with the default views of names (all indices if None)."""
+        names = self.indices if names is None else names
+        with metrics.span('startup.warm'):
+            self.comparison_results.warm([()])
+            self.index_results.warm([(name,) for name in names])
+            self.tracking_results.warm([(name, 'M') for name in names])
+            self.ols_path_results.warm([(name, 52) for name in names])
+            self.basket_weight_results.warm([(name, 52) for name in [index_registry.OFFICIAL_COLUMN, *names]])
+
+    def tracking_error_label(self, name):
+        """Overall tracking error of name with the months its deviations span."""
+        dates = self.merged_clean.loc[self.merged_clean[f'Deviation {name}'].notna(), 'Average for Week Ending']
+        if dates.empty:
+            return f'Tracking Error: no deviations for {name} yet'
+        return f"Tracking Error from {dates.min():%b %Y} - {dates.max():%b %Y}: {self.tracking_errors[name]:.6f}"
+
+    def format_table_rows(self, frame):
+        return frame[self.table_columns].assign(**{'Average for Week Ending': frame['Average for Week Ending'].dt.strftime('%Y-%m-%d')})
+
+    @metrics.timed('compute.comparison_figure')
+    def build_comparison_figure(self, x_range=None):
+        """
+        Comparison plot over x_range (the whole history if None), every series downsampled to
+        the chart's resolution so the figure size does not grow with the history.
+        """
+        df_full = self.df_full
+        fig_comparison = go.Figure()
+
+        # Official Index line
+        fig_comparison.add_trace(downsample.line_trace(
+            df_full['Average for Week Ending'], df_full['Official'], 'Official Index', x_range
+        ))
+
+        #custom indices with levels in df_full
+        for name in self.level_indices:
+            fig_comparison.add_trace(downsample.line_trace(
+                df_full['Average for Week Ending'], df_full[name], f'{name} Index', x_range
+            ))
+
+        fig_comparison.update_layout(
+            title=f"Comparison of Official Index and Custom Indices ({', '.join(self.level_indices)})",
+            xaxis_title='Date',
+            yaxis_title='Index Value',
+            legend_title='Index',
+            template='plotly_white',
+            xaxis=dict(tickangle=45, range=x_range),
+            uirevision='comparison',
+            height=600
+        )
+        return fig_comparison.to_dict()
+
+    @metrics.timed('compute.deviation_figure')
+    def build_deviation_figure(self, name, x_range=None):
+        """Deviation plot for one index over x_range (the whole history if None), downsampled like the comparison plot."""
+        merged_clean = self.merged_clean
+        deviation_fig = go.Figure()
+        deviation_fig.add_trace(downsample.line_trace(
+            merged_clean['Average for Week Ending'], merged_clean[f'Deviation {name}'], f'{name} Deviation', x_range
+        ))
+        deviation_fig.update_layout(
+            title=f'Deviation for {name}',
+            xaxis_title='Date',
+            yaxis_title='Deviation',
+            xaxis=dict(range=x_range),
+            uirevision=name
+        )
+        return deviation_fig.to_dict()
+
+    def compute_index_results(self, name):
+        """
+        Build the deviation figure and OLS summary text for one index.
+        Works on local copies only, merged_clean is shared between requests and never mutated.
+        """
+        #figures are cached as plain dicts so repeated callbacks skip plotly validation
+        deviation_fig = self.build_deviation_figure(name)
+        with metrics.span('compute.ols_summary'):
+            summary = regression.ols_summary(self.df, f'Deviation {name}', self.currencies)
+        return {'deviation_fig': deviation_fig, 'ols_summary': summary}
+
+    def compute_tracking_error(self, name, window):
+        """
+        Build the tracking error frame and figure for one index over one of te.WINDOWS.
+        Calendar windows are drawn as bars per period, rolling windows as a line per observation.
+        """
+        label = te.WINDOWS[window]
+        column = f'Tracking Error - {name}'
+        with metrics.span('compute.tracking_error'):
+            error = te.tracking_error_frame(self.merged_clean, [f'Deviation {name}'], window)
+        error.columns = [column]
+
+        with metrics.span('compute.tracking_error_figure'):
+            error_fig = go.Figure()
+            if window in te.CALENDAR_WINDOWS:
+                error_fig.add_trace(go.Bar(
+                    x=error.index,
+                    y=error[column],
+                    name=f'{label} Tracking Error - {name}'
+                ))
+            else:
+                error_fig.add_trace(go.Scatter(
+                    x=error.index,
+                    y=error[column],
+                    mode='lines',
+                    name=f'{label} Tracking Error - {name}'
+                ))
+            error_fig.update_layout(
+                title=f'{label} Tracking Error for {name}',
+                xaxis_title={'M': 'Month', 'Q': 'Quarter'}.get(window, 'Date'),
+                yaxis_title='Tracking Error'
+            )
+            error_fig = error_fig.to_dict()
+        return {'tracking_error_fig': error_fig, 'tracking_error': error}
+
+    @metrics.timed('compute.ols_paths')
+    def compute_ols_paths(self, window):
+        """
+        Rolling (window observations) or expanding (window=None) regressions of every deviation
+        series on the currency returns, all indices solved in one batch.
+        """
+        return regression.ols_paths(self.df, self.deviation_columns, self.currencies, window=window)
+
+    @metrics.timed('compute.ols_path_figures')
+    def compute_ols_path_figures(self, name, window):
+        """Coefficient and t-stat time-series charts for one index."""
+        paths = self.ols_paths.get(window)[f'Deviation {name}']
+        span = 'Expanding' if window is None else f'Rolling {window}-observation'
+
+        coef_fig = go.Figure()
+        tstat_fig = go.Figure()
+        for currency in self.currencies:
+            coef_fig.add_trace(go.Scatter(
+                x=paths['params'].index,
+                y=paths['params'][currency],
+                mode='lines',
+                name=currency
+            ))
+            tstat_fig.add_trace(go.Scatter(
+                x=paths['tvalues'].index,
+                y=paths['tvalues'][currency],
+                mode='lines',
+                name=currency
+            ))
+        coef_fig.update_layout(
+            title=f'{span} OLS Coefficients for {name}',
+            xaxis_title='Date',
+            yaxis_title='Coefficient',
+            template='plotly_white'
+        )
+        #+-1.96 marks 5% two-sided significance
+        for level in (-1.96, 1.96):
+            tstat_fig.add_hline(y=level, line_dash='dash', line_color='grey')
+        tstat_fig.update_layout(
+            title=f'{span} OLS t-statistics for {name}',
+            xaxis_title='Date',
+            yaxis_title='t-statistic',
+            template='plotly_white'
+        )
+        return {'coef_fig': coef_fig.to_dict(), 'tstat_fig': tstat_fig.to_dict()}
+
+    @metrics.timed('compute.basket_weights')
+    def compute_basket_weights(self, window):
+        """
+        Implied basket weights of the official index and every index with levels over rolling
+        windows of `window` observations, see basket_weights.implied_weights.
+        """
+        #levels on the currency rows' dates before differencing, as for the deviations, so every return spans the same interval
+        rows = self.df.dropna(subset=['Average for Week Ending']).sort_values('Average for Week Ending')
+        levels = index_registry.aligned_levels(rows, self.weight_series, self.df_full)
+        frame = np.log1p(rows[self.currencies]).assign(
+            **{'Average for Week Ending': rows['Average for Week Ending']},
+            **{name: np.diff(np.log(levels[name]), prepend=np.nan) for name in self.weight_series},
+        )
+        return basket_weights.implied_weights(frame, self.weight_series, self.currencies, window=window)
+
+    def compute_basket_weight_figures(self, name, window):
+        """
+        Implied weight paths of one series as a stacked area chart, and for a custom index its
+        weights minus the official index's, the weight mismatch behind its deviations.
+        """
+        weights_fig = go.Figure()
+        gap_fig = go.Figure()
+        if name not in self.weight_series:
+            weights_fig.update_layout(title=f'No index levels for {name}, its basket weights cannot be implied')
+            return {'weights_fig': weights_fig.to_dict(), 'gap_fig': gap_fig.to_dict()}
+
+        all_weights = self.basket_weights.get(window)
+        weights = all_weights[name]
+        official = all_weights[index_registry.OFFICIAL_COLUMN]
+        for currency in self.currencies:
+            weights_fig.add_trace(go.Scatter(
+                x=weights.index,
+                y=weights[currency],
+                mode='lines',
+                stackgroup='weights',
+                name=currency
+            ))
+            if name != index_registry.OFFICIAL_COLUMN:
+                gap_fig.add_trace(go.Scatter(
+                    x=weights.index,
+                    y=weights[currency] - official[currency],
+                    mode='lines',
+                    name=currency
+                ))
+        weights_fig.update_layout(
+            title=f'Implied Basket Weights of {name} (rolling {window} observations)',
+            xaxis_title='Date',
+            yaxis_title='Weight',
+            yaxis=dict(range=[0, 1]),
+            template='plotly_white'
+        )
+        gap_fig.update_layout(
+            title=f'Implied Weight of {name} minus Official' if name != index_registry.OFFICIAL_COLUMN else 'Select a custom index to compare its weights with the official index',
+            xaxis_title='Date',
+            yaxis_title='Weight difference',
+            template='plotly_white'
+        )
+        return {'weights_fig': weights_fig.to_dict(), 'gap_fig': gap_fig.to_dict()}
+
+    def bootstrap(self, name):
+        """
+        Block-bootstrap confidence intervals of the tracking error and the OLS coefficients of
+        one index, see bootstrap.py. Submits the job on the first call for the current data
+        version and returns the jobs.Job without waiting for it.
+        """
+        key = (name, self.version)
+        job = self.bootstrap_jobs.get(key)
+        if job is not None and job.state != 'failed':
+            return job
+        column = f'Deviation {name}'
+        calls = bootstrap.tasks(self.merged_clean, column, self.currencies)
+        combine = functools.partial(
+            bootstrap.summarize,
+            estimate_te=self.tracking_errors[name],
+            estimate_params=self.ols_fit['params'][column].to_numpy(),
+            regressors=['const', *self.currencies],
+            block=calls[0][3],
+        )
+        return self.bootstrap_jobs.submit(key, bootstrap.replicate, calls, combine)
+
+    def build_bootstrap_figure(self, name, result):
+        """OLS coefficients of one index with their bootstrap confidence intervals."""
+        params = result['params'].drop(index='const')
+        fig = go.Figure(go.Scatter(
+            x=params.index,
+            y=params['estimate'],
+            mode='markers',
+            error_y=dict(type='data', symmetric=False, array=params['high'] - params['estimate'], arrayminus=params['estimate'] - params['low']),
+            name='Coefficient'
+        ))
+        fig.add_hline(y=0, line_dash='dash', line_color='grey')
+        fig.update_layout(
+            title=f"OLS Coefficients for {name} with {1 - bootstrap.ALPHA:.0%} Bootstrap Intervals",
+            xaxis_title='Currency',
+            yaxis_title='Coefficient',
+            template='plotly_white'
+        )
+        return fig.to_dict()
+
+    def refresh(self):
+        """
+        Fold rows appended to the store since the last refresh into the data.
+        Tracking errors (Welford) and OLS fits (sufficient statistics) are updated from the new
+        rows only, everything else is recomputed lazily under a new data version.
+        Returns the current data version.
+        """
+        #polls that find nothing new are timed too, they run every refresh interval per client
+        with self._lock, metrics.span('refresh'):
+            new_df = data_store.load_appends(self.currency_file, self.df_version, self.applied_chunks[0])
+            new_full = data_store.load_appends(self.index_file, self.df_full_version, self.applied_chunks[1])
+            if not new_df and not new_full:
+                return self.version
+
+            #index rows first, deviations derived from df_full levels need them
+            if new_full:
+                appended = pd.concat([self.df_full, *new_full], ignore_index=True)
+                self.df_full = data_store.combine_dates(appended)
+                if self.df_full is appended:
+                    self.table_frame = pd.concat([self.table_frame, *[self.format_table_rows(chunk) for chunk in new_full]], ignore_index=True)
+                else:
+                    self.table_frame = self.format_table_rows(self.df_full)
+            if new_df or (new_full and self.derived_columns):
+                self._fold_rows(new_df)
+
+            self.applied_chunks = [self.applied_chunks[0] + len(new_df), self.applied_chunks[1] + len(new_full)]
+            self.version = (self.df_version, self.df_full_version, tuple(self.applied_chunks))
+            for cache in self.caches.values():
+                cache.set_version(self.version)
+            return self.version
+
+    def _fold_rows(self, new_df):
+        """
+        Add the currency rows new_df to df and update the running statistics with every deviation
+        not seen before: all of the new rows, and those of existing rows whose index levels only
+        arrived now. Deviations derived from levels need the previous row, so they are rederived
+        over the whole frame. When that changes a deviation already in the statistics (a row
+        dated between existing ones) or rows are combined with existing dates, the statistics
+        are rebuilt from the whole frame instead.
+        """
+        n_old = len(self.df)
+        previous = self.df[self.derived_columns].to_numpy(dtype=float)
+        appended = pd.concat([self.df.drop(columns=self.derived_columns), *new_df], ignore_index=True)
+        frame = data_store.combine_dates(appended)
+        combined = index_registry.add_deviations(frame, self.indices, self.df_full)
+        self.df = combined
+        self.merged_clean = combined.dropna(subset=['Average for Week Ending']).dropna(subset=self.deviation_columns, how='all')
+
+        rebuild = frame is not appended
+        if not rebuild:
+            new_rows = combined.loc[combined.index >= n_old]
+            old_rows = combined.loc[np.arange(n_old)]
+            current = old_rows[self.derived_columns].to_numpy(dtype=float)
+            filled = np.isnan(previous) & ~np.isnan(current)
+            #rederiving gives bit-identical values wherever the neighbouring levels did not change
+            rebuild = (~filled & (previous != current) & ~(np.isnan(previous) & np.isnan(current))).any()
+
+        if rebuild:
+            self.tracking_moments = te.StreamingMoments(self.deviation_columns)
+            self.tracking_moments.update(self.merged_clean[self.deviation_columns])
+            self.ols_state = regression.OLSAccumulator(self.deviation_columns, self.currencies)
+            self.ols_state.update(combined)
+        else:
+            if filled.any():
+                #only the newly filled values count, everything else in these rows is already in the statistics
+                old_rows = old_rows.assign(**{col: np.nan for col in self.deviation_columns})
+                old_rows[self.derived_columns] = np.where(filled, current, np.nan)
+                new_rows = pd.concat([new_rows, old_rows[filled.any(axis=1)]])
+            new_clean = new_rows.dropna(subset=['Average for Week Ending']).dropna(subset=self.deviation_columns, how='all')
+            self.tracking_moments.update(new_clean[self.deviation_columns])
+            self.ols_state.update(new_rows)
+        self.tracking_errors = dict(zip(self.indices, np.round(self.tracking_moments.std(), 6)))
+        self.ols_fit = self.ols_state.fit()
+
+    def health(self):
+        """Summary for the health endpoint."""
+        return {
+            'status': 'ok',
+            'version': str(self.version),
+            'indices': self.indices,
+            'rows': len(self.df),
+            'index_rows': len(self.df_full),
+            'pid': os.getpid(),
+        }
+
+    def collect_metrics(self):
+        """Cache and data-size metrics for metrics.render, see metrics.register_collector."""
+        samples = [
+            ('sgdneer_data_rows', 'gauge', {'frame': 'currency'}, len(self.df)),
+            ('sgdneer_data_rows', 'gauge', {'frame': 'index'}, len(self.df_full)),
+        ]
+        for name, cache in self.caches.items():
+            lookups = cache.hits + cache.misses
+            samples += [
+                ('sgdneer_cache_hits_total', 'counter', {'cache': name}, cache.hits),
+                ('sgdneer_cache_misses_total', 'counter', {'cache': name}, cache.misses),
+                ('sgdneer_cache_hit_ratio', 'gauge', {'cache': name}, cache.hits / lookups if lookups else 0.0),
+                ('sgdneer_cache_entries', 'gauge', {'cache': name}, len(cache)),
+            ]
+        return samples
@@ -0,0 +1,187 @@
+"""
+Columnar on-disk cache for the Excel inputs.
+
+Each workbook is parsed once with pd.read_excel and written as one .npy file per
+column (dates as datetime64[ns]) under CACHE_DIR. Later starts, and every worker
+process, memory-map those files instead of parsing the workbook again. A cached
+copy is reused as long as the workbook's mtime/size, or failing that its content
+hash, has not changed.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+CACHE_DIR = os.environ.get('SGDNEER_CACHE_DIR', '.sgdneer_cache')
+DATE_COLUMN = 'Average for Week Ending'
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stem(source):
+    return os.path.splitext(os.path.basename(source))[0]
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, payload):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _source_digest(source):
+    """
+    Content hash of the workbook. The hash is only recomputed when mtime or size
+    differ from the last recorded stat, so an unchanged file costs one os.stat.
+    """
+    stat = os.stat(source)
+    stamp_path = os.path.join(CACHE_DIR, f'{_stem(source)}.json')
+    stamp = _read_json(stamp_path)
+    if stamp and stamp.get('mtime_ns') == stat.st_mtime_ns and stamp.get('size') == stat.st_size:
+        return stamp['sha1']
+
+    digest = _file_hash(source)
+    _write_json(stamp_path, {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': digest})
+    return digest
+
+
+def _write_columns(frame, path):
+    """
+    Write frame as one .npy per column plus a manifest, into a temporary directory that
+    is renamed into place, so concurrent workers never see a half-written cache.
+    Returns False if another process had already put a directory at path.
+    """
+    tmp = f'{path}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = []
+    for i, col in enumerate(frame.columns):
+        values = frame[col].to_numpy()
+        if values.dtype.kind == 'M':
+            values = values.astype('datetime64[ns]')
+        # non-numeric columns cannot be memory-mapped, they are pickled instead
+        np.save(os.path.join(tmp, f'{i}.npy'), values, allow_pickle=values.dtype == object)
+        columns.append({'name': str(col), 'file': f'{i}.npy', 'mmap': values.dtype != object})
+
+    _write_json(os.path.join(tmp, 'manifest.json'), {'columns': columns, 'rows': len(frame)})
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # another process finished writing the same version first
+        shutil.rmtree(tmp, ignore_errors=True)
+        return False
+    return True
+
+
+def _read_columns(path):
+    manifest = _read_json(os.path.join(path, 'manifest.json'))
+    if manifest is None:
+        return None
+    data = {}
+    for col in manifest['columns']:
+        file = os.path.join(path, col['file'])
+        if col['mmap']:
+            data[col['name']] = np.load(file, mmap_mode='r')
+        else:
+            data[col['name']] = np.load(file, allow_pickle=True)
+    return pd.DataFrame(data, copy=False)
+
+
+def load_frame(source, date_columns=(DATE_COLUMN,)):
+    """
+    Load an Excel sheet through the columnar cache.
+
+    Returns (frame, version) where version is the content hash of the workbook, so callers
+    can key derived results on it. date_columns are stored as datetime64[ns].
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    version = _source_digest(source)
+    path = os.path.join(CACHE_DIR, f'{_stem(source)}-{version[:16]}')
+
+    with metrics.span('load.read_cache'):
+        frame = _read_columns(path)
+    if frame is None:
+        with metrics.span('load.read_excel'):
+            frame = pd.read_excel(source)
+            for col in date_columns:
+                frame[col] = pd.to_datetime(frame[col])
+        with metrics.span('load.write_cache'):
+            _write_columns(frame, path)
+            frame = _read_columns(path)
+    return frame, version
+
+
+def _appends_path(source, version):
+    return os.path.join(CACHE_DIR, f'{_stem(source)}-{version[:16]}-appends')
+
+
+def append_frame(source, frame, date_columns=(DATE_COLUMN,)):
+    """
+    Append rows to the store of source as a new numbered chunk, without touching the workbook
+    or the cached base columns. The log belongs to the current workbook version, so replacing
+    the workbook starts a fresh log. Returns the sequence number of the chunk.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _appends_path(source, _source_digest(source))
+    os.makedirs(path, exist_ok=True)
+
+    frame = frame.copy()
+    for col in date_columns:
+        frame[col] = pd.to_datetime(frame[col])
+    seq = sum(name.isdigit() for name in os.listdir(path))
+    # another process may claim the same number between listdir and rename, then try the next one
+    while not _write_columns(frame, os.path.join(path, f'{seq:06d}')):
+        seq += 1
+    return seq
+
+
+def load_appends(source, version, start=0):
+    """Chunks appended to source for the given workbook version, from sequence number start on."""
+    path = _appends_path(source, version)
+    if not os.path.isdir(path):
+        return []
+    names = sorted(name for name in os.listdir(path) if name.isdigit() and int(name) >= start)
+    chunks = []
+    for name in names:
+        # stop at a gap so chunks are always applied in order
+        if int(name) != start + len(chunks):
+            break
+        chunk = _read_columns(os.path.join(path, name))
+        if chunk is None:
+            break
+        chunks.append(chunk)
+    return chunks
+
+
+def combine_dates(frame, date_column=DATE_COLUMN):
+    """
+    One row per date: rows sharing a date (a chunk completing an earlier row, e.g. a late MAS
+    print for a week whose index fixes came first) are combined, a later non-missing value
+    taking precedence. Rows without a date are kept as they are. Returns frame itself when
+    its dates are already unique.
+    """
+    dated = frame[date_column].notna()
+    if not frame.loc[dated, date_column].duplicated().any():
+        return frame
+    combined = frame[dated].groupby(date_column, sort=False, as_index=False).last()
+    return pd.concat([combined, frame[~dated]], ignore_index=True)[frame.columns]
@@ -0,0 +1,93 @@
+"""
+Resolution-aware line traces for long time series.
+
+Series longer than MAX_POINTS are reduced with LTTB (largest triangle three buckets)
+to roughly two points per horizontal pixel of a full-width chart, and series longer
+than WEBGL_THRESHOLD are drawn with WebGL (go.Scattergl) instead of SVG. On zoom the
+dashboard asks for the visible x range only, so a zoomed-in chart is sent at full
+resolution while the payload stays the same size however long the history grows.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+WEBGL_THRESHOLD = 1000
+MAX_POINTS = 2000
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices of the n_out points kept by LTTB. x must be increasing and numeric, y free of NaN.
+    The first and last points are always kept, every bucket in between keeps the point
+    forming the largest triangle with the previously kept point and the next bucket's mean.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    #bucket means are needed for every bucket up front, one reduceat instead of a loop
+    counts = np.diff(np.append(edges, n - 1))
+    counts[counts == 0] = 1
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts[:-1]
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts[:-1]
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        area = np.abs(
+            (x[a] - mean_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (mean_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def visible_range(relayout_data):
+    """
+    x range zoomed into from a Graph's relayoutData, as a pair of datetime64, or None when
+    the chart shows its full range (autorange, reset or no x zoom).
+    """
+    if not relayout_data or relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        x0, x1 = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    elif 'xaxis.range' in relayout_data:
+        x0, x1 = relayout_data['xaxis.range']
+    else:
+        return None
+    return pd.Timestamp(x0).to_datetime64(), pd.Timestamp(x1).to_datetime64()
+
+
+def line_trace(x, y, name, x_range=None, max_points=MAX_POINTS):
+    """
+    Line trace for a date series, restricted to x_range (a pair of datetime64) if given,
+    downsampled to max_points and drawn with WebGL above WEBGL_THRESHOLD points.
+    Points need not be in date order.
+    """
+    x = np.asarray(x, dtype='datetime64[ns]')
+    y = np.asarray(y, dtype=float)
+    keep = ~np.isnan(y) & ~np.isnat(x)
+    x, y = x[keep], y[keep]
+    #the range lookup and LTTB need increasing dates, the frames keep the workbooks' row order
+    if len(x) and (np.diff(x) < np.timedelta64(0)).any():
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+    if x_range is not None:
+        #one point either side so the line runs to the edges of the visible range
+        lo = max(np.searchsorted(x, x_range[0], side='left') - 1, 0)
+        hi = np.searchsorted(x, x_range[1], side='right') + 1
+        x, y = x[lo:hi], y[lo:hi]
+
+    n_total = len(x)
+    if n_total > max_points:
+        kept = lttb_indices((x - x[0]).astype('int64').astype(float), y, max_points)
+        x, y = x[kept], y[kept]
+
+    trace = go.Scattergl if n_total > WEBGL_THRESHOLD else go.Scatter
+    return trace(x=x, y=y, mode='lines', name=name)
@@ -0,0 +1,27 @@
+"""gunicorn settings for wsgi.py, overridable through the SGDNEER_* environment variables."""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get('SGDNEER_BIND', '0.0.0.0:8051')
+workers = int(os.environ.get('SGDNEER_WORKERS', multiprocessing.cpu_count()))
+#read by jobs.PROCESSES, which shares the CPUs out between the workers' process pools
+os.environ['SGDNEER_WORKERS'] = str(workers)
+worker_class = 'gthread'
+threads = int(os.environ.get('SGDNEER_THREADS', 4))
+timeout = int(os.environ.get('SGDNEER_TIMEOUT', 120))
+
+#load data in the master before forking so workers share it (copy-on-write)
+preload_app = True
+
+#workers write their metrics here so a scrape of any of them reports all (see metrics.py), a
+#fresh directory per server run unless one is given; set before the preloaded app imports metrics
+if 'SGDNEER_METRICS_DIR' not in os.environ:
+    os.environ['SGDNEER_METRICS_DIR'] = tempfile.mkdtemp(prefix='sgdneer-metrics-')
+    _created_metrics_dir = os.environ['SGDNEER_METRICS_DIR']
+
+
+def on_exit(server):
+    if globals().get('_created_metrics_dir'):
+        shutil.rmtree(_created_metrics_dir, ignore_errors=True)
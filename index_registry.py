@@ -0,0 +1,235 @@
+"""
+Registry of the custom indices tracked against the official SGD NEER.
+
+Indices are declared here with their provider and the commentary shown in the
+dashboard. Which indices are actually shown is discovered from the input data:
+every declared index with a deviation column or levels to derive one from, plus any
+undeclared 'Deviation <name>' column, or level column in df.xlsx named like an index
+ticker (LEVEL_NAME_PATTERN), which get generic commentary built from their numbers.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+import data_store
+
+DATE_COLUMN = 'Average for Week Ending'
+OFFICIAL_COLUMN = 'Official'
+DEVIATION_PREFIX = 'Deviation '
+#undeclared level columns are indices only when named like a ticker quoted in SGD (CTSGSGD, IDX02SGD),
+#other numeric columns of df.xlsx such as a saved 'Unnamed: 0' index are not
+LEVEL_NAME_PATTERN = re.compile(r'[A-Z0-9]+SGD')
+
+INDEX_REGISTRY = {
+    'CTSGSGD': {
+        'provider': 'Citi',
+        'deviation_comment': """
+        *Deviation is calculated by the difference between Official index return and Custom index return ,i.e. official index return - custom index return
+        This provides an insight into a more spotaneous performance in discrepancy between the two indices on a weekly basis.
+        
+        Most data points are close to zero, with in the band of +-0.1%, indicating the Citi index generally tracks the MAS NEER well over time. The error fluctuate around zero, implies that Citi index is unbiased in its tracking as it does not systematically deviate in one direction
+        The constant small noise could be due to differences in data source, sampling timing etc. Each index may rely on different sources of data or even different methodologies to interpret the data. For example, one index might use spot exchange rates while another might use forward exchange rates or trade-weighted averages. These different approaches to data collection and calculation can contribute to constant discrepancies between the indices
+        
+        Obervations:
+        1. Deviation in May 2022
+        Both the Citi and Goldman indices experienced significant deviations in May 2022, suggesting a common external factor or structural shift affecting both indices simultaneously. One possible explanation could be MAS Policy Shift.In April 2022, MAS tightened its monetary policy by increasing the slope of the SGD NEER policy band to allow for a faster appreciation of the SGD, aimed at combating inflation. Such a policy shift could include adjustments in the official SGD NEER, which the custom indices (Citi and Goldman) may have struggled to immediately replicate.
+        Another guess would be sensitivity to USD Fluctuations. Since the OLS regression for the Citi index showed that USD returns have a significant positive coefficient (0.1413, p = 0.003), indicating that deviations are highly sensitive to USD movements. In May 2022, the USD was appreciating rapidly due to the Fed’s aggressive rate hikes, causing the SGD NEER to behave differently than expected. If the Citi index underestimated the USD relative to the official index, this could explain the spike in deviations.
+        
+        2. Sharp Peak and Trough in November 2022
+        On November 2, 2022, the Federal Reserve announced its fourth consecutive 75 basis point interest rate increase, raising the federal funds rate to a target range of 3.75% to 4%. USD peaked after a prolonged period of strength, then began to decline as markets anticipated a potential slowdown in Fed rate hikes.The volatility in USD could be contributing to the changes in index
+
+        3. Trough on March 24, 2023
+        March 2023 saw significant financial market stress due to the collapse of Silicon Valley Bank (SVB) and concerns about Credit Suisse, which led to heightened risk aversion and safe-haven flows into the USD. The sudden appreciation of the USD likely caused fluctuations
+        """,
+
+        'tracking_error_comment': """
+        Tracking error is calculated as the standard deviation of the difference between the official, Tracking Error=std(Official Index Return - Custom Index Return)
+        This metric measures the volatility or variability of the differences between the returns of the official index and the custom index, rather than just the direct differences (deviation) at each point in time. 
+        A lower tracking error indicates that the custom index closely and consistently tracks the official index, making it a more reliable tool for tracking purposes.
+        
+        The average tracking error over the period from Jan 2022 to Dec 2024 is relatively low at 0.000632, indicating that the Citi-tracked index generally follows the official MAS SGD NEER index closely with minimal long-term deviation and it could be a reliable tool to use for tracking.
+        
+        However, there are periods of increased tracking error, the spikes in tracking error in May 2022 and Dec 2022 period suggesting that the custom index may lag in adjusting to changes in the official MAS SGD NEER, following similar reasons in Deviaiton plot
+        
+        There is a upward trend in tracking error toward the end of 2024, which could signal the need to monitor the index more closely and potentially revise its methodology or rebalancing process to maintain tracking accuracy
+
+
+        """,
+        'ols_comment': """
+        From the OLS summary, it can be seen that coefficient for USD is 0.1413 (p-value = 0.003) and it is significant. It indicates that deviations between the indices are sensitive to fluctuations in the USD. As the coefficient is positive, it means that when that currency’s return increases, the official index return exceeds the custom index return, resulting in positive deviation. This could be an indication that citi index underestimated the weightage of USD
+        
+        The IDR coefficient (-0.0651), though smaller, is notable due to its marginal significance. This could indicate that the IDR also plays a secondary role in contributing to the deviations.
+        
+        Other currencies like EUR, JPY, CNY, and MYR do not appear to significantly influence the deviations, suggesting that their weights or impacts are more closely aligned between the two indices.
+        
+        *Currencies with high correlation due to central bank policies and regional trade linkages are omitted to avoid high multicollinearity: HKD, TWD, KRW, THB, IDR, and PHP
+        """,
+
+        'conclusion': """
+        The Citi-tracked index demonstrates strong overall performance in tracking the official MAS SGD NEER index. Most deviations are close to zero and fluctuate around zero, indicating that the Citi index is unbiased in its tracking and the tracking error over the period from January 2022 to December 2024 is relatively low at 0.0632%, reflecting a high degree of consistency and reliability in tracking the official index over the long term.
+        
+        However, small but consistent noise in the deviations can be attributed to differences in data sources, sampling timing, or data collection methodologies between the indices. The analysis also suggests that the Citi index may have underestimated the weightage of the USD, as spikes in deviation and volatility appear to coincide with periods of heightened USD fluctuations.
+        
+        To further improve the analysis, it will be more beneficial to have more detailed information about the custom index. For example, knowing the exact weights of the currencies in the custom index would allow a more precise understanding of how currency movements influence the deviations and knowing when and how the index rebalances its weights could also clarify spikes in tracking error
+
+        Another improvement would be to understand how the formula of indices are constructed. The current analysis assumes the index is a linear combination of exchange rates. However, if the index is constructed differently (e.g., as a product of exchange rates or includes non-linear transformations), this assumption may not hold.In such cases, analyzing deviations might require transformations like natural logarithms or other forms of data manipulation to better reflect the relationship between the indices.
+        """,
+    },
+    'GSSGSGD': {
+        'provider': 'Goldman',
+        'deviation_comment': """
+        *Deviation is calculated by the difference between Official index return and Custom index return ,i.e. official index return - custom index return
+        This provides an insight into a more spotaneous performance in discrepancy between the two indices on a weekly basis.
+        
+        Most data points are close to zero, with in the band of +-0.1%, indicating the index generally tracks the MAS NEER well over time. The error fluctuate around zero, implies that index is unbiased in its tracking as it does not systematically deviate in one direction
+        The constant small noise could be due to differences in data source, sampling timing etc. Each index may rely on different sources of data or even different methodologies to interpret the data. For example, one index might use spot exchange rates while another might use forward exchange rates or trade-weighted averages. These different approaches to data collection and calculation can contribute to constant discrepancies between the indices
+        
+        Obervations:
+        1. Deviation in May 2022
+        Both the Citi and Goldman indices experienced significant deviations in May 2022, suggesting a common external factor or structural shift affecting both indices simultaneously. One possible explanation could be MAS Policy Shift.In April 2022, MAS tightened its monetary policy by increasing the slope of the SGD NEER policy band to allow for a faster appreciation of the SGD, aimed at combating inflation. Such a policy shift could include adjustments in the official SGD NEER, which the custom indices (Citi and Goldman) may have struggled to immediately replicate.
+        2. Peaks in April and September 2024
+        The cause of the deviations observed on April 5-12, 2024, and September 27, 2024, is unclear. However, it is evident that these deviations are not driven by USD fluctuations, as the Citi index, despite also having a significant USD weightage difference, does not exhibit similar fluctuations during these periods.
+
+        """,
+        'tracking_error_comment': """
+        Tracking error for GSSGSGD is calculated as the standard deviation of the difference between the official, Tracking Error=std(Official Index Return - Custom Index Return)
+        This metric measures the volatility or variability of the differences between the returns of the official index and the custom index, rather than just the direct differences (deviation) at each point in time. 
+        A lower tracking error indicates that the custom index closely and consistently tracks the official index, making it a more reliable tool for tracking purposes.
+        
+        The tracking error chart for GSSGSGD shows that the Goldman index generally tracks the MAS SGD NEER closely, with a low overall tracking error of 0.0578%. This indicates strong alignment between the two indices under normal conditions and coud be a reliable tool to be used for tracking.
+
+        However, notable spikes in tracking error occur in May and Dec 2022 due to similar reasons in Citi index, and in Apr 2024, Sep 2024, and Dec 2024, likely caused by external factors such as methodology rebalancing 
+        
+        """,
+        'ols_comment': """
+        R-squared value of 0.068 means that only 6.8 percent of the variance in the deviations is explained by the currency returns. This suggests that the model captures only a small portion of the factors driving the deviations, and other unmodeled factors (e.g., methodology differences, data sources, or rebalancing frequency) may play a larger role.
+
+        The USD has a negative coefficient (-0.0781) and is marginally significant at the 10 percent level, meaning that when the USD strengthens (i.e., its returns increase), the Goldman index return is likely higher than the official return, implying an overestimation of weighting in USD
+
+        *Currencies with high correlation due to central bank policies and regional trade linkages are omitted to avoid high multicollinearity: HKD, TWD, KRW, THB, IDR, and PHP
+        """,
+        'conclusion': """
+        The GS index demonstrates strong overall performance in tracking the official MAS SGD NEER index. Most deviations are close to zero and fluctuate around zero, indicating that the GS index is unbiased in its tracking and the tracking error over the period from January 2022 to December 2024 is relatively low at 0.0578% (lower than Citi index), reflecting a high degree of consistency and reliability in tracking the official index over the long term.
+        
+        However, small but consistent noise in the deviations can be attributed to differences in data sources, sampling timing, or data collection methodologies between the indices. The analysis also suggests that the GS index may have overestimated the weightage of the USD, as spikes in deviation and volatility appear to coincide with periods of heightened USD fluctuations.
+        
+        To further improve the analysis, it will be more beneficial to have more detailed information about the custom index. For example, knowing the exact weights of the currencies in the custom index would allow a more precise understanding of how currency movements influence the deviations and knowing when and how the index rebalances its weights could also clarify whether spikes in tracking error
+
+        Another improvement would be to understand how the formula of indices are constructed. The current analysis assumes the index is a linear combination of exchange rates. However, if the index is constructed differently (e.g., as a product of exchange rates or includes non-linear transformations), this assumption may not hold.In such cases, analyzing deviations might require transformations like natural logarithms or other forms of data manipulation to better reflect the relationship between the indices.
+        """,
+    },
+}
+
+
+def _level_columns(df_full):
+    """
+    Index level columns of df_full: numeric columns named like an index quoted in SGD
+    (LEVEL_NAME_PATTERN), or declared in the registry.
+    """
+    if df_full is None:
+        return []
+    return [
+        col for col in df_full.columns
+        if isinstance(col, str) and (col in INDEX_REGISTRY or LEVEL_NAME_PATTERN.fullmatch(col))
+        and pd.api.types.is_numeric_dtype(df_full[col])
+    ]
+
+
+def discover_indices(df, df_full=None):
+    """
+    Names of the indices whose deviations are in the input data or can be derived from it:
+    declared indices with a deviation column in df or a level column in df/df_full, in
+    registry order, then undeclared 'Deviation <name>' columns in the order they appear in
+    df, then undeclared level columns of df_full. Levels only count when the official index
+    levels are available too.
+    """
+    deviation_names = [
+        col[len(DEVIATION_PREFIX):] for col in df.columns
+        if isinstance(col, str) and col.startswith(DEVIATION_PREFIX)
+    ]
+    level_names = _level_columns(df_full)
+    has_official = OFFICIAL_COLUMN in df.columns or (df_full is not None and OFFICIAL_COLUMN in df_full.columns)
+    levels = set(df.columns) | set(level_names) if has_official else set()
+
+    declared = [name for name in INDEX_REGISTRY if name in deviation_names or name in levels]
+    undeclared = [name for name in deviation_names if name not in INDEX_REGISTRY]
+    undeclared += [name for name in level_names if name not in INDEX_REGISTRY and name not in undeclared]
+    return declared + (undeclared if has_official else [name for name in undeclared if name in deviation_names])
+
+
+def aligned_levels(df, names, df_full=None):
+    """
+    Levels of each of names on the rows of df: df's own column if it has one, else df_full's
+    matched on date. Names without levels are left out. Returns {name: array}.
+    """
+    full = None
+    if df_full is not None:
+        full = data_store.combine_dates(df_full.dropna(subset=[DATE_COLUMN])).set_index(DATE_COLUMN).reindex(df[DATE_COLUMN])
+    levels = {}
+    for name in names:
+        if name in df.columns:
+            levels[name] = df[name].to_numpy(dtype=float)
+        elif full is not None and name in full.columns:
+            levels[name] = full[name].to_numpy(dtype=float)
+    return levels
+
+
+def add_deviations(df, names, df_full=None):
+    """
+    Return df sorted by date with a 'Deviation <name>' column for every name that has one or
+    levels to derive it from. Missing deviation columns are derived in one matrix operation,
+    official return - index return between consecutive rows of df, from the levels in df or
+    else from those in df_full matched on date (see aligned_levels).
+    """
+    missing = [name for name in names if DEVIATION_PREFIX + name not in df.columns]
+    if not missing:
+        return df
+
+    df = df.sort_values(DATE_COLUMN)
+    levels = aligned_levels(df, [OFFICIAL_COLUMN, *missing], df_full)
+    missing = [name for name in missing if name in levels]
+    if OFFICIAL_COLUMN not in levels or not missing:
+        return df
+
+    levels = np.column_stack([levels[OFFICIAL_COLUMN], *(levels[name] for name in missing)])
+    returns = np.full_like(levels, np.nan)
+    returns[1:] = levels[1:] / levels[:-1] - 1
+    deviations = returns[:, :1] - returns[:, 1:]
+    return df.assign(**{DEVIATION_PREFIX + name: deviations[:, j] for j, name in enumerate(missing)})
+
+
+def commentary(name, tracking_error, fit):
+    """
+    Commentary for one index: the registry text for declared indices, otherwise generic text
+    filled in from the overall tracking error and the full-sample OLS fit (see regression.fit_ols).
+    """
+    entry = INDEX_REGISTRY.get(name, {})
+    column = DEVIATION_PREFIX + name
+    params, pvalues = fit['params'][column], fit['pvalues'][column]
+    regressors = [r for r in params.index if r != 'const']
+    strongest = min(regressors, key=lambda r: pvalues[r]) if regressors else None
+
+    generic = {
+        'deviation_comment': f"""
+        *Deviation is calculated by the difference between Official index return and Custom index return ,i.e. official index return - custom index return
+        This provides an insight into a more spotaneous performance in discrepancy between the two indices on a weekly basis.
+
+        Deviations that stay close to zero indicate that {name} tracks the MAS NEER well, deviations persistently on one side would indicate a bias in its tracking.
+        """,
+        'tracking_error_comment': f"""
+        Tracking error for {name} is calculated as the standard deviation of the difference between the official, Tracking Error=std(Official Index Return - Custom Index Return)
+        A lower tracking error indicates that the custom index closely and consistently tracks the official index, making it a more reliable tool for tracking purposes.
+
+        The tracking error over the whole period is {tracking_error:.6f}.
+        """,
+        'ols_comment': f"""
+        R-squared value of {fit['rsquared'][column]:.3f} means that {fit['rsquared'][column] * 100:.1f} percent of the variance in the deviations is explained by the currency returns.
+        """ + (f"""
+        The most significant currency is {strongest} with a coefficient of {params[strongest]:.4f} (p-value = {pvalues[strongest]:.3f}). A positive coefficient suggests the index underestimates the weightage of {strongest}, a negative one that it overestimates it.
+        """ if strongest else ''),
+        'conclusion': f"""
+        {name} tracks the official MAS SGD NEER index with an overall tracking error of {tracking_error * 100:.4f}%.
+        """,
+    }
+    return {key: entry.get(key, text) for key, text in generic.items()}
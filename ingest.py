@@ -0,0 +1,153 @@
+"""
+Incremental ingestion of new observations.
+
+append_rows adds rows (new MAS prints, daily custom index fixes) to the append-only
+store kept next to the cached workbook, see data_store.append_frame. Running
+dashboards poll that store and fold new chunks into their statistics without a
+restart. DropFolderWatcher turns files dropped into a folder into append_rows calls.
+
+    python ingest.py currency_merged.xlsx new_rows.csv
+    python ingest.py --watch incoming/
+"""
+import argparse
+import logging
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+
+import data_store
+from dashboard_data import CURRENCY_FILE, INDEX_FILE
+
+logger = logging.getLogger(__name__)
+
+#workbooks that accept new rows, the ones the dashboard loads; files in the drop folder are routed by filename prefix
+SOURCES = [CURRENCY_FILE, INDEX_FILE]
+
+
+def read_rows(path):
+    if path.lower().endswith(('.xlsx', '.xls')):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def stored_rows(source):
+    """Rows of source, the cached workbook and its appended chunks, one per date."""
+    frame, version = data_store.load_frame(source)
+    return data_store.combine_dates(pd.concat([frame, *data_store.load_appends(source, version)], ignore_index=True))
+
+
+def append_rows(source, rows):
+    """
+    Append rows (DataFrame or list of dicts) to source. Rows need the date column and
+    should use the workbook's column names. Rows may be dated before the last stored date.
+    A row for a date source already has completes it: it is kept only if it fills in values
+    missing for that date and contradicts none of those there (corrections go through the
+    workbook). Rows repeating a date within rows are combined first. Returns the chunk
+    sequence number.
+    """
+    frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    if data_store.DATE_COLUMN not in frame.columns:
+        raise ValueError(f"Rows for {source} need a '{data_store.DATE_COLUMN}' column")
+    frame = frame.dropna(subset=[data_store.DATE_COLUMN])
+    if frame.empty:
+        raise ValueError(f'No rows to append to {source}')
+    frame = data_store.combine_dates(frame.assign(**{data_store.DATE_COLUMN: pd.to_datetime(frame[data_store.DATE_COLUMN])}))
+
+    stored = stored_rows(source).dropna(subset=[data_store.DATE_COLUMN]).set_index(data_store.DATE_COLUMN)
+    known = frame[data_store.DATE_COLUMN].isin(stored.index).to_numpy()
+    if known.any():
+        given = frame.loc[known].drop(columns=[data_store.DATE_COLUMN]).reset_index(drop=True)
+        there = stored.reindex(frame.loc[known, data_store.DATE_COLUMN]).reindex(columns=given.columns).reset_index(drop=True)
+        adds = (given.notna() & there.isna()).any(axis=1).to_numpy()
+        conflicts = (given.notna() & there.notna() & (given != there)).any(axis=1).to_numpy()
+        keep = ~known
+        keep[known] = adds & ~conflicts
+        if conflicts.any():
+            logger.warning('Dropped %d rows for %s that contradict values already there', conflicts.sum(), source)
+        if (~adds & ~conflicts).any():
+            logger.warning('Dropped %d rows for %s that add nothing to their dates', (~adds & ~conflicts).sum(), source)
+        frame = frame[keep]
+    if frame.empty:
+        raise ValueError(f'No rows for {source} add anything to the dates already there')
+    return data_store.append_frame(source, frame)
+
+
+def source_for(filename, sources=SOURCES):
+    """Workbook a dropped file belongs to, e.g. currency_merged_20250110.csv -> currency_merged.xlsx."""
+    stems = {os.path.splitext(os.path.basename(source))[0]: source for source in sources}
+    matches = [stem for stem in stems if os.path.basename(filename).startswith(stem)]
+    return stems[max(matches, key=len)] if matches else None
+
+
+class DropFolderWatcher(threading.Thread):
+    """
+    Poll a folder for .csv/.xlsx files and append them to the matching source. Ingested files
+    are moved to folder/processed, files that cannot be read or routed to folder/failed.
+    Files modified within the last interval are left for the next poll, they may still be
+    being copied in.
+    """
+
+    def __init__(self, folder, sources=SOURCES, interval=5.0):
+        super().__init__(daemon=True)
+        self.folder = folder
+        self.sources = sources
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def poll(self):
+        settled = time.time() - self.interval
+        for name in sorted(os.listdir(self.folder)):
+            path = os.path.join(self.folder, name)
+            if not os.path.isfile(path) or not name.lower().endswith(('.csv', '.xlsx', '.xls')):
+                continue
+            try:
+                if os.path.getmtime(path) > settled:
+                    continue
+            except OSError:
+                continue
+            source = source_for(name, self.sources)
+            try:
+                if source is None:
+                    raise ValueError(f'No source matches {name}')
+                seq = append_rows(source, read_rows(path))
+                logger.info('Appended %s to %s as chunk %d', name, source, seq)
+                done = 'processed'
+            except Exception:
+                logger.exception('Could not ingest %s', name)
+                done = 'failed'
+            #a file that cannot be moved away must not stop the watcher, its dates are rejected next time
+            try:
+                os.makedirs(os.path.join(self.folder, done), exist_ok=True)
+                shutil.move(path, os.path.join(self.folder, done, name))
+            except OSError:
+                logger.exception('Could not move %s to %s', name, done)
+
+    def run(self):
+        while not self._stopped.is_set():
+            self.poll()
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Append new observations to the SGDNEER dashboard data.')
+    parser.add_argument('source', nargs='?', help='workbook to append to, e.g. currency_merged.xlsx')
+    parser.add_argument('rows', nargs='?', help='CSV or Excel file with the new rows')
+    parser.add_argument('--watch', metavar='FOLDER', help='keep ingesting files dropped into FOLDER')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between polls of FOLDER')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.watch:
+        watcher = DropFolderWatcher(args.watch, interval=args.interval)
+        watcher.start()
+        watcher.join()
+    elif args.source and args.rows:
+        print(append_rows(args.source, read_rows(args.rows)))
+    else:
+        parser.error('give a source and a rows file, or --watch FOLDER')
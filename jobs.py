@@ -0,0 +1,321 @@
+"""
+Background jobs on a process pool, for computations too slow for a callback.
+
+A job is a list of calls of one function, run on a spawn-context process pool, whose
+results are combined once all have finished. Callbacks submit a job and return
+immediately, then poll its progress (calls finished out of total) until the result is
+there.
+
+Job state lives in files under data_store.CACHE_DIR/jobs, one directory per job key
+(which includes the data version), so every worker process serving the dashboard sees
+the same jobs: the first worker to claim a key runs it and records its progress and
+result there, the others only read them. A claim whose progress has not moved for
+STALE_SECONDS (its worker died) is taken over, and a failed job is resubmitted on the
+next request. Every new data version gives new keys, so beyond maxsize jobs the least
+recently used finished ones are deleted.
+
+Only the claiming worker's pool runs a job, and each pool has PROCESSES processes,
+by default the CPUs divided among the SGDNEER_WORKERS server workers.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import data_store
+
+logger = logging.getLogger(__name__)
+
+PROCESSES = int(os.environ.get('SGDNEER_PROCESSES', 0)) or max((os.cpu_count() or 1) // int(os.environ.get('SGDNEER_WORKERS', 1)), 1)
+STALE_SECONDS = 120
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def process_pool(processes=PROCESSES):
+    """
+    This process's spawn-context pool of `processes` processes, started on first use and kept
+    for later calls, so only the first job or batch of solves pays for the processes
+    importing numpy and pandas. Shared by JobRunner and basket_weights.
+    """
+    #keyed by pid too: a pool inherited through fork belongs to the parent
+    key = (os.getpid(), processes)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        return pool
+
+
+def discard_pool(pool):
+    """Shut down a pool (e.g. one a process died in) so the next process_pool call starts a fresh one."""
+    with _pools_lock:
+        for key, known in list(_pools.items()):
+            if known is pool:
+                del _pools[key]
+    pool.shutdown(wait=False)
+
+
+def shutdown_pools():
+    """Shut down this process's pools, e.g. in a preloading server master before it forks workers."""
+    with _pools_lock:
+        pools = [pool for (pid, _), pool in _pools.items() if pid == os.getpid()]
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class Job:
+    """View of the state of one job, read from its directory."""
+
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+        self._result = None
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @property
+    def state(self):
+        if os.path.exists(self._file('error')):
+            return 'failed'
+        return 'done' if os.path.exists(self._file('result.pkl')) else 'running'
+
+    def _progress(self):
+        try:
+            with open(self._file('progress')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'done': 0, 'total': 0}
+
+    @property
+    def done(self):
+        return self._progress()['done']
+
+    @property
+    def total(self):
+        return self._progress()['total']
+
+    @property
+    def progress(self):
+        progress = self._progress()
+        return progress['done'] / progress['total'] if progress['total'] else 0.0
+
+    @property
+    def result(self):
+        if self._result is None and self.state == 'done':
+            #None if the job was pruned in the meantime, see JobRunner._prune
+            try:
+                with open(self._file('result.pkl'), 'rb') as f:
+                    self._result = pickle.load(f)
+            except OSError:
+                pass
+        return self._result
+
+    @property
+    def error(self):
+        try:
+            with open(self._file('error')) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def stale(self):
+        """Whether the job is running but its progress has not moved for STALE_SECONDS."""
+        if self.state != 'running':
+            return False
+        #the claim is taken just before the first progress is written
+        for name in ('progress', 'claim'):
+            try:
+                return time.time() - os.path.getmtime(self._file(name)) > STALE_SECONDS
+            except OSError:
+                pass
+        return False
+
+
+class _Run:
+    """Bookkeeping of a job run by this process: collects the results and writes progress."""
+
+    def __init__(self, job, total, combine):
+        self.job = job
+        self.total = total
+        self.done = 0
+        self.failed = False
+        self.broken_pool = False
+        self._combine = combine
+        self._parts = [None] * total
+        self._lock = threading.Lock()
+        self._write_progress()
+
+    def _write_progress(self):
+        _write_atomic(self.job._file('progress'), json.dumps({'done': self.done, 'total': self.total}).encode())
+
+    def finished(self, i, future):
+        #runs on the executor's management thread, exceptions have to be recorded rather than raised
+        with self._lock:
+            if self.failed:
+                return
+            try:
+                self._parts[i] = future.result()
+                self.done += 1
+                self._write_progress()
+                if self.done == self.total:
+                    _write_atomic(self.job._file('result.pkl'), pickle.dumps(self._combine(self._parts)))
+                    self._parts = None
+            except Exception as exc:
+                logger.exception('Job %s failed', self.job.key)
+                self.failed = True
+                self.broken_pool = isinstance(exc, BrokenProcessPool)
+                _write_atomic(self.job._file('error'), repr(exc).encode())
+
+
+class JobRunner:
+    def __init__(self, processes=PROCESSES, directory=None, maxsize=32):
+        """
+        processes: size of this process's pool (see process_pool), started when it first runs a job
+        directory: where job state is kept, data_store.CACHE_DIR/jobs if None
+        maxsize: number of jobs kept before the least recently used finished one is deleted
+        """
+        self.processes = processes
+        self.directory = directory
+        self.maxsize = maxsize
+        self.submitted = 0
+        self.resubmitted = 0
+        self._runs = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _directory(self):
+        return self.directory or os.path.join(data_store.CACHE_DIR, 'jobs')
+
+    def _path(self, key):
+        return os.path.join(self._directory(), hashlib.sha1(repr(key).encode()).hexdigest()[:16])
+
+    def _pool(self):
+        self._executor = process_pool(self.processes)
+        return self._executor
+
+    def get(self, key):
+        """The job submitted under key by any worker, or None if there is none or it was abandoned."""
+        path = self._path(key)
+        if not os.path.exists(os.path.join(path, 'claim')):
+            return None
+        job = Job(key, path)
+        if job.stale():
+            return None
+        if job.state == 'done':
+            #the directory's mtime is the job's last use, see _prune
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return job
+
+    def _prune(self):
+        """Delete the least recently used finished, failed or abandoned jobs beyond maxsize."""
+        directory = self._directory()
+        jobs = []
+        for name in os.listdir(directory):
+            #renamed claims and directories being deleted have a dot in their name
+            if '.' in name:
+                continue
+            job = Job(None, os.path.join(directory, name))
+            try:
+                jobs.append((os.path.getmtime(job.path), job))
+            except OSError:
+                pass
+        done = sorted((item for item in jobs if item[1].state != 'running' or item[1].stale()), key=lambda item: item[0])
+        for _, job in done[:max(len(jobs) - self.maxsize, 0)]:
+            #renaming first means no other worker reads a half-deleted job
+            trash = f'{job.path}.{os.getpid()}.pruned'
+            try:
+                os.rename(job.path, trash)
+            except OSError:
+                continue
+            shutil.rmtree(trash, ignore_errors=True)
+
+    def _claim(self, job):
+        """Take the job's claim, releasing a failed or abandoned one first. False if another worker has it."""
+        claim = job._file('claim')
+        if job.state == 'failed' or job.stale():
+            #renaming is atomic, so of several workers releasing the same claim only one succeeds
+            try:
+                os.rename(claim, f'{claim}.{os.getpid()}.released')
+            except OSError:
+                return False
+            for name in ('error', 'progress'):
+                try:
+                    os.remove(job._file(name))
+                except OSError:
+                    pass
+            self.resubmitted += 1
+        try:
+            os.close(os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def submit(self, key, fn, calls, combine):
+        """
+        Run fn(*args) for every args in calls on this process's pool and store combine(results)
+        when all are done, unless some worker is already running or has finished the job.
+        Returns the Job.
+        """
+        with self._lock:
+            job = Job(key, self._path(key))
+            os.makedirs(job.path, exist_ok=True)
+            if not self._claim(job):
+                return job
+
+            previous = self._runs.pop(key, None)
+            if previous is not None and previous.broken_pool and self._executor is not None:
+                #a pool whose process died cannot take new work, start a fresh one
+                discard_pool(self._executor)
+                self._executor = None
+            try:
+                run = self._start(job, fn, calls, combine)
+            except BrokenProcessPool:
+                discard_pool(self._executor)
+                self._executor = None
+                run = self._start(job, fn, calls, combine)
+            #finished runs are only needed to tell a broken pool apart
+            self._runs = {k: r for k, r in self._runs.items() if r.failed or r.done < r.total}
+            self._runs[key] = run
+            self.submitted += 1
+            self._prune()
+            return job
+
+    def _start(self, job, fn, calls, combine):
+        run = _Run(job, len(calls), combine)
+        pool = self._pool()
+        for i, args in enumerate(calls):
+            pool.submit(fn, *args).add_done_callback(lambda future, i=i, run=run: run.finished(i, future))
+        return run
+
+    def collect_metrics(self):
+        """Job counts of this process for metrics.render, see metrics.register_collector."""
+        with self._lock:
+            runs = list(self._runs.values())
+        running = sum(not run.failed and run.done < run.total for run in runs)
+        return [
+            ('sgdneer_jobs_submitted_total', 'counter', {}, self.submitted),
+            ('sgdneer_jobs_resubmitted_total', 'counter', {}, self.resubmitted),
+            ('sgdneer_jobs_running', 'gauge', {}, running),
+        ]
@@ -0,0 +1,319 @@
+"""
+Low-overhead instrumentation for the dashboard, exposed in Prometheus text format.
+
+    with metrics.span('compute.ols_summary'):
+        ...
+
+records the duration into sgdneer_span_seconds{span="compute.ols_summary"}. Dash callbacks
+are wrapped with callback(name), and init_app adds per-request timings and response sizes,
+the time spent outside the callback body (Dash dispatch and JSON serialization of the
+Plotly outputs) as span="serialize.<name>", a /metrics endpoint, and (when
+SGDNEER_PROFILING=1) a cProfile capture of a single request sent with the header
+X-Sgdneer-Profile: 1, written to SGDNEER_PROFILE_DIR.
+
+A span costs two perf_counter calls and one locked dict update. Metrics are kept per
+process. With several workers (gunicorn.conf.py sets SGDNEER_METRICS_DIR) every process
+also writes them to SGDNEER_METRICS_DIR/<pid>.json every FLUSH_SECONDS, and a scrape of
+any worker merges all the files: histograms and counters are summed over the processes,
+gauges are reported per live process with a pid label. The directory has to be emptied
+between server runs. Without it, a scrape reports the process that answered it.
+"""
+import bisect
+import cProfile
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+HELP = {
+    'sgdneer_span_seconds': 'Duration of instrumented startup, compute and callback phases.',
+    'sgdneer_request_seconds': 'Duration of HTTP requests, by Dash callback or route.',
+    'sgdneer_response_bytes': 'Size of HTTP response bodies, by Dash callback or route.',
+}
+PROFILING = os.environ.get('SGDNEER_PROFILING') == '1'
+PROFILE_DIR = os.environ.get('SGDNEER_PROFILE_DIR', 'profiles')
+MULTIPROCESS_DIR = os.environ.get('SGDNEER_METRICS_DIR')
+FLUSH_SECONDS = 5.0
+
+_lock = threading.Lock()
+_histograms = {}
+_collectors = {}
+#held while a flush runs, so a fork never happens in the middle of one
+_flush_lock = threading.Lock()
+_flusher_pid = None
+#collector counters as of the last flush, and those inherited from the process this one was
+#forked from, which that process's file already counts
+_flushed_counters = {}
+_inherited_counters = {}
+#callback body time of the request being served by this thread, see callback and init_app
+_request = threading.local()
+
+
+def observe(metric, value, buckets=BUCKETS, **labels):
+    """Add one observation to the histogram metric{labels}."""
+    key = (metric, tuple(sorted(labels.items())))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {'buckets': buckets, 'counts': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+        hist['counts'][bisect.bisect_left(buckets, value)] += 1
+        hist['sum'] += value
+        hist['count'] += 1
+    if MULTIPROCESS_DIR and _flusher_pid != os.getpid():
+        _start_flusher()
+
+
+@contextmanager
+def span(name):
+    """Time the body of the with block as sgdneer_span_seconds{span=name}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('sgdneer_span_seconds', time.perf_counter() - start, span=name)
+
+
+def timed(name):
+    """Decorator form of span."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def callback(name):
+    """Decorator for Dash callbacks, times the body and remembers it for the serialize span."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                _request.callback = (name, elapsed)
+                observe('sgdneer_span_seconds', elapsed, span=f'callback.{name}')
+        return wrapper
+    return decorator
+
+
+def register_collector(name, collect):
+    """
+    Register collect() to be called on every scrape. It returns (metric, type, labels, value)
+    tuples, e.g. cache hit counters. Registering the same name again replaces the collector.
+    """
+    _collectors[name] = collect
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = ((key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _snapshot():
+    """Copies of this process's histograms and the current collector samples."""
+    with _lock:
+        histograms = {key: {**hist, 'counts': list(hist['counts'])} for key, hist in _histograms.items()}
+    samples = [
+        (metric, kind, tuple(sorted(labels.items())), value)
+        for collect in list(_collectors.values()) for metric, kind, labels, value in collect()
+    ]
+    return histograms, samples
+
+
+def flush():
+    """Write this process's metrics to MULTIPROCESS_DIR/<pid>.json for render in any process."""
+    global _flushed_counters
+    if not MULTIPROCESS_DIR:
+        return
+    with _flush_lock:
+        histograms, samples = _snapshot()
+        _flushed_counters = {(metric, labels): value for metric, kind, labels, value in samples if kind == 'counter'}
+        payload = {
+            'histograms': [[metric, labels, hist['buckets'], hist['counts'], hist['sum'], hist['count']] for (metric, labels), hist in histograms.items()],
+            'samples': [
+                [metric, kind, labels, value - _inherited_counters.get((metric, labels), 0) if kind == 'counter' else value]
+                for metric, kind, labels, value in samples
+            ],
+        }
+        os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+        path = os.path.join(MULTIPROCESS_DIR, f'{os.getpid()}.json')
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception:
+            logger.exception('Could not flush metrics to %s', MULTIPROCESS_DIR)
+
+
+def _start_flusher():
+    #threads do not survive a fork, every process starts its own on its first observation
+    global _flusher_pid
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def _before_fork():
+    _flush_lock.acquire()
+    _lock.acquire()
+
+
+def _after_fork_in_parent():
+    _lock.release()
+    _flush_lock.release()
+
+
+def _after_fork_in_child():
+    #what was observed before the fork is in the parent's file, the child reports only what it adds
+    global _lock, _flush_lock, _inherited_counters
+    _lock, _flush_lock = threading.Lock(), threading.Lock()
+    _histograms.clear()
+    _inherited_counters = dict(_flushed_counters)
+
+
+if MULTIPROCESS_DIR:
+    os.register_at_fork(before=_before_fork, after_in_parent=_after_fork_in_parent, after_in_child=_after_fork_in_child)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merged():
+    """Histograms and samples of every process that wrote to MULTIPROCESS_DIR, see flush."""
+    histograms, samples = {}, {}
+    for name in os.listdir(MULTIPROCESS_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(MULTIPROCESS_DIR, name)) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            continue
+        pid = int(name[:-len('.json')])
+        #counters and histograms of exited workers still count, their gauges are gone
+        alive = _alive(pid)
+        for metric, labels, buckets, counts, total, count in payload['histograms']:
+            key = (metric, tuple(map(tuple, labels)))
+            hist = histograms.setdefault(key, {'buckets': tuple(buckets), 'counts': [0] * len(counts), 'sum': 0.0, 'count': 0})
+            hist['counts'] = [a + b for a, b in zip(hist['counts'], counts)]
+            hist['sum'] += total
+            hist['count'] += count
+        for metric, kind, labels, value in payload['samples']:
+            labels = tuple(map(tuple, labels))
+            if kind == 'counter':
+                key = (metric, kind, labels)
+                samples[key] = samples.get(key, 0) + value
+            elif alive:
+                samples[(metric, kind, (*labels, ('pid', pid)))] = value
+    return histograms, [(*key, value) for key, value in samples.items()]
+
+
+def render():
+    """All metrics in Prometheus text exposition format."""
+    if MULTIPROCESS_DIR:
+        flush()
+        histograms, samples = _merged()
+    else:
+        pid = ('pid', os.getpid())
+        histograms, samples = _snapshot()
+        histograms = {(metric, (*labels, pid)): hist for (metric, labels), hist in histograms.items()}
+        samples = [(metric, kind, (*labels, pid), value) for metric, kind, labels, value in samples]
+
+    lines = []
+    seen = set()
+    for (metric, labels), hist in sorted(histograms.items(), key=lambda item: item[0]):
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f'# HELP {metric} {HELP.get(metric, metric)}')
+            lines.append(f'# TYPE {metric} histogram')
+        cumulative = 0
+        for bound, count in zip((*hist['buckets'], float('inf')), hist['counts']):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{metric}_bucket{_labels((*labels, ("le", le)))} {cumulative}')
+        lines.append(f'{metric}_sum{_labels(labels)} {hist["sum"]}')
+        lines.append(f'{metric}_count{_labels(labels)} {hist["count"]}')
+
+    #a metric family has to be contiguous, collectors may interleave them
+    for metric, kind, labels, value in sorted(samples, key=lambda sample: sample[0]):
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f'# TYPE {metric} {kind}')
+        lines.append(f'{metric}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _request_label(request):
+    """Callback (first output) for Dash updates, otherwise the matched route."""
+    if request.path.endswith('/_dash-update-component'):
+        body = request.get_json(silent=True) or {}
+        output = body.get('output', '')
+        return output.strip('.').split('...')[0] or 'unknown'
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def init_app(server):
+    """Add request timing, response sizes, the /metrics endpoint and optional profiling to a Flask server."""
+    import flask
+
+    @server.before_request
+    def _start_request():
+        flask.g.metrics_start = time.perf_counter()
+        _request.callback = None
+        if PROFILING and flask.request.headers.get('X-Sgdneer-Profile') == '1':
+            flask.g.profiler = cProfile.Profile()
+            flask.g.profiler.enable()
+
+    @server.after_request
+    def _finish_request(response):
+        start = flask.g.pop('metrics_start', None)
+        profiler = flask.g.pop('profiler', None)
+        label = _request_label(flask.request)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{label.replace('/', '_')}.prof")
+            profiler.dump_stats(path)
+            response.headers['X-Sgdneer-Profile-File'] = path
+        if start is not None and label != '/metrics':
+            elapsed = time.perf_counter() - start
+            observe('sgdneer_request_seconds', elapsed, callback=label)
+            timed_callback = getattr(_request, 'callback', None)
+            if timed_callback is not None:
+                name, body = timed_callback
+                observe('sgdneer_span_seconds', elapsed - body, span=f'serialize.{name}')
+            observe('sgdneer_response_bytes', response.content_length or 0, buckets=BYTE_BUCKETS, callback=label)
+        return response
+
+    @server.route('/metrics')
+    def _metrics():
+        return flask.Response(render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,240 @@
+"""
+Batched least squares for the deviation-vs-currency regressions.
+
+Full-sample fits of all indices share the design matrix X and are done as one
+multi-right-hand-side least-squares solve. OLSAccumulator keeps the sufficient
+statistics of those fits so ingested rows refresh them without a refit.
+
+Rolling and expanding coefficient paths are obtained from windowed normal
+equations: X'X, X'y and y'y are accumulated for every window at once (sliding
+window einsum for rolling, cumulative sums for expanding) and all k x k systems
+are inverted in one batched np.linalg.inv call, which also gives the standard
+errors, for every dependent column at once.
+"""
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import stats
+
+
+def _solve_normal_equations(xtx, xty, yty, nobs):
+    """
+    Solve a stack of normal equations.
+
+    xtx: (w, k, k), xty: (w, k, m), yty: (w, m), nobs: (w,)
+    Returns params and t-values, both of shape (w, k, m). Windows with no more
+    observations than regressors are NaN.
+    """
+    w, k, m = xty.shape
+    params = np.full((w, k, m), np.nan)
+    tvalues = np.full((w, k, m), np.nan)
+    ok = nobs > k
+    if not ok.any():
+        return params, tvalues
+
+    try:
+        inv = np.linalg.inv(xtx[ok])
+    except np.linalg.LinAlgError:
+        # a collinear window poisons the whole batch for inv, pinv handles each one separately
+        inv = np.linalg.pinv(xtx[ok])
+    beta = inv @ xty[ok]
+    rss = np.maximum(yty[ok] - np.einsum('wkm,wkm->wm', beta, xty[ok]), 0.0)
+    sigma2 = rss / (nobs[ok] - k)[:, None]
+    se = np.sqrt(np.diagonal(inv, axis1=1, axis2=2)[:, :, None] * sigma2[:, None, :])
+
+    params[ok] = beta
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tvalues[ok] = beta / se
+    return params, tvalues
+
+
+def rolling_ols(X, Y, window):
+    """
+    OLS of every column of Y on X over each trailing window of `window` observations.
+
+    X: (n, k), Y: (n, m). Returns params and t-values of shape (n - window + 1, k, m),
+    row i belongs to the window ending at observation i + window - 1.
+    """
+    Xw = sliding_window_view(X, window, axis=0)
+    Yw = sliding_window_view(Y, window, axis=0)
+    xtx = np.einsum('ikt,ilt->ikl', Xw, Xw)
+    xty = np.einsum('ikt,imt->ikm', Xw, Yw)
+    yty = np.einsum('imt,imt->im', Yw, Yw)
+    nobs = np.full(len(xtx), window)
+    return _solve_normal_equations(xtx, xty, yty, nobs)
+
+
+def expanding_ols(X, Y):
+    """
+    OLS of every column of Y on X over observations 0..i for every i.
+
+    Returns params and t-values of shape (n, k, m).
+    """
+    xtx = np.cumsum(X[:, :, None] * X[:, None, :], axis=0)
+    xty = np.cumsum(X[:, :, None] * Y[:, None, :], axis=0)
+    yty = np.cumsum(Y * Y, axis=0)
+    nobs = np.arange(1, len(X) + 1)
+    return _solve_normal_equations(xtx, xty, yty, nobs)
+
+
+def ols_paths(frame, y_columns, x_columns, window=None, min_periods=26, date_column='Average for Week Ending'):
+    """
+    Coefficient and t-stat paths of each y column regressed on a constant and x_columns.
+
+    window=None gives expanding-window estimates, starting once min_periods observations are
+    available, an int gives rolling windows of that many observations. Each y column uses
+    the rows where it and every x column are present; y columns with the same missing-value
+    pattern share their rows and are solved in one batch, usually that is all of them.
+
+    Returns {y column: {'params': DataFrame, 'tvalues': DataFrame}}, indexed by the date of
+    the last observation in each window, one column per regressor ('const' first).
+    """
+    y_columns = list(y_columns)
+    frame = frame.dropna(subset=[date_column, *x_columns]).sort_values(date_column)
+    X_all = np.column_stack([np.ones(len(frame)), frame[list(x_columns)].to_numpy(dtype=float)])
+    Y_all = frame[y_columns].to_numpy(dtype=float)
+    dates_all = frame[date_column].to_numpy()
+    regressors = ['const', *x_columns]
+
+    paths = {}
+    patterns, group = np.unique(~np.isnan(Y_all).T, axis=0, return_inverse=True)
+    for g, pattern in enumerate(patterns):
+        cols = np.flatnonzero(group.ravel() == g)
+        X, Y, dates = X_all[pattern], Y_all[pattern][:, cols], dates_all[pattern]
+        if window is None:
+            params, tvalues = expanding_ols(X, Y)
+            params, tvalues = params[min_periods - 1:], tvalues[min_periods - 1:]
+        elif len(X) < window:
+            params = tvalues = np.empty((0, len(regressors), len(cols)))
+        else:
+            params, tvalues = rolling_ols(X, Y, window)
+        index = pd.Index(dates[len(dates) - len(params):], name=date_column)
+        for j, col in enumerate(cols):
+            paths[y_columns[col]] = {
+                'params': pd.DataFrame(params[:, :, j], index=index, columns=regressors),
+                'tvalues': pd.DataFrame(tvalues[:, :, j], index=index, columns=regressors),
+            }
+    return {col: paths[col] for col in y_columns}
+
+
+def fit_ols(frame, y_columns, x_columns):
+    """
+    Full-sample OLS of every y column on a constant and x_columns.
+
+    y columns with the same missing-value pattern share their rows, so they are fitted
+    together in one multi-right-hand-side np.linalg.lstsq call; usually that is all of them.
+
+    Returns a dict with 'params', 'bse', 'tvalues', 'pvalues' (DataFrames, one row per
+    regressor with 'const' first, one column per y column) and 'rsquared', 'nobs' (Series).
+    """
+    regressors = ['const', *x_columns]
+    y_columns = list(y_columns)
+    X_all = np.column_stack([np.ones(len(frame)), frame[list(x_columns)].to_numpy(dtype=float)])
+    Y_all = frame[y_columns].to_numpy(dtype=float)
+    rows = ~np.isnan(Y_all) & ~np.isnan(X_all).any(axis=1)[:, None]
+
+    k = len(regressors)
+    fit = {key: np.full((k, len(y_columns)), np.nan) for key in ('params', 'bse', 'tvalues', 'pvalues')}
+    rsquared = np.full(len(y_columns), np.nan)
+    nobs = np.zeros(len(y_columns), dtype=int)
+
+    patterns, group = np.unique(rows.T, axis=0, return_inverse=True)
+    for g, pattern in enumerate(patterns):
+        cols = np.flatnonzero(group.ravel() == g)
+        X, Y = X_all[pattern], Y_all[pattern][:, cols]
+        n = len(X)
+        if n <= k:
+            continue
+        beta = np.linalg.lstsq(X, Y, rcond=None)[0]
+        resid = Y - X @ beta
+        rss = (resid * resid).sum(axis=0)
+        sigma2 = rss / (n - k)
+        se = np.sqrt(np.diag(np.linalg.pinv(X.T @ X))[:, None] * sigma2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = beta / se
+            rsquared[cols] = 1 - rss / ((Y - Y.mean(axis=0)) ** 2).sum(axis=0)
+        fit['params'][:, cols] = beta
+        fit['bse'][:, cols] = se
+        fit['tvalues'][:, cols] = t
+        fit['pvalues'][:, cols] = 2 * stats.t.sf(np.abs(t), n - k)
+        nobs[cols] = n
+
+    result = {key: pd.DataFrame(value, index=regressors, columns=y_columns) for key, value in fit.items()}
+    result['rsquared'] = pd.Series(rsquared, index=y_columns)
+    result['nobs'] = pd.Series(nobs, index=y_columns)
+    return result
+
+
+class OLSAccumulator:
+    """
+    Sufficient statistics (X'X, X'y, y'y, sum of y, count) of the full-sample regression of
+    each y column on a constant and x_columns, plus (X'X)^-1 kept current with Sherman-Morrison
+    rank-one updates, so each new row refreshes the coefficients in O(k^2) per y column.
+    """
+
+    def __init__(self, y_columns, x_columns):
+        self.y_columns = list(y_columns)
+        self.x_columns = list(x_columns)
+        k, m = len(self.x_columns) + 1, len(self.y_columns)
+        self.xtx = np.zeros((m, k, k))
+        self.xty = np.zeros((m, k))
+        self.yty = np.zeros(m)
+        self.ysum = np.zeros(m)
+        self.nobs = np.zeros(m, dtype=int)
+        self.inv = np.full((m, k, k), np.nan)
+
+    def update(self, frame):
+        """Add the rows of frame. Each y column only uses rows where it and all x are present."""
+        X = np.column_stack([np.ones(len(frame)), frame[self.x_columns].to_numpy(dtype=float)])
+        Y = frame[self.y_columns].to_numpy(dtype=float)
+        valid = ~np.isnan(Y) & ~np.isnan(X).any(axis=1)[:, None]
+        X = np.where(np.isnan(X), 0.0, X)
+        Y = np.where(valid, Y, 0.0)
+        k = X.shape[1]
+
+        #small batches (new observations) take rank-one updates of the inverse, anything larger a batched reinversion
+        rank_one = len(X) < k and np.isfinite(self.inv).all()
+        for i in range(len(X)) if rank_one else ():
+            x, cols = X[i], valid[i]
+            px = self.inv[cols] @ x
+            denom = 1.0 + px @ x
+            self.inv[cols] -= px[:, :, None] * px[:, None, :] / denom[:, None, None]
+
+        W = valid.astype(float)
+        self.xtx += np.einsum('nm,nk,nl->mkl', W, X, X)
+        self.xty += np.einsum('nk,nm->mk', X, Y)
+        self.yty += (Y * Y).sum(axis=0)
+        self.ysum += Y.sum(axis=0)
+        self.nobs += valid.sum(axis=0)
+        if not rank_one:
+            ok = self.nobs > k
+            self.inv[ok] = np.linalg.pinv(self.xtx[ok])
+
+    def fit(self):
+        """Current fit in the same layout as fit_ols."""
+        regressors = ['const', *self.x_columns]
+        k = len(regressors)
+        beta = np.einsum('mkl,ml->mk', self.inv, self.xty)
+        rss = np.maximum(self.yty - (beta * self.xty).sum(axis=1), 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dof = np.where(self.nobs > k, self.nobs - k, np.nan)
+            se = np.sqrt(np.diagonal(self.inv, axis1=1, axis2=2) * (rss / dof)[:, None])
+            t = beta / se
+            tss = self.yty - self.ysum ** 2 / self.nobs
+            rsquared = 1 - rss / tss
+        p = 2 * stats.t.sf(np.abs(t), dof[:, None])
+
+        result = {
+            key: pd.DataFrame(value.T, index=regressors, columns=self.y_columns)
+            for key, value in (('params', beta), ('bse', se), ('tvalues', t), ('pvalues', p))
+        }
+        result['rsquared'] = pd.Series(rsquared, index=self.y_columns)
+        result['nobs'] = pd.Series(self.nobs, index=self.y_columns)
+        return result
+
+
+def ols_summary(frame, y_column, x_columns):
+    """statsmodels summary text of the full-sample fit of one y column, for display."""
+    data = frame.dropna(subset=[y_column, *x_columns])
+    return sm.OLS(data[y_column], sm.add_constant(data[list(x_columns)])).fit().summary().as_text()
@@ -0,0 +1,58 @@
+"""
+Versioned LRU cache for per-index dashboard results.
+
+Entries are keyed by the call arguments plus the current input-data version, so a
+change of data version makes every older entry unreachable and it is evicted in
+LRU order like any other entry.
+"""
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, compute, version, maxsize=32):
+        """
+        compute: function called with the cache key arguments on a miss
+        version: identifier of the input data the results are derived from
+        maxsize: number of entries kept before the least recently used is evicted
+        """
+        self.compute = compute
+        self.version = version
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, *args):
+        key = (args, self.version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # computed outside the lock so a slow miss does not block lookups of other keys
+        value = self.compute(*args)
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def warm(self, keys):
+        """Compute each key in keys (tuples of arguments) ahead of the first request."""
+        for args in keys:
+            self.get(*args)
+
+    def set_version(self, version):
+        """Switch to a new data version; entries for the old version are dropped."""
+        with self._lock:
+            self.version = version
+            self._entries.clear()
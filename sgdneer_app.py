@@ -1,337 +1,423 @@
+import os
+import threading
+
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
-import pandas as pd
-import numpy as np
-import statsmodels.api as sm
-import plotly.graph_objects as go
-
-app = dash.Dash(__name__)
-
- 
-df = pd.read_excel("currency_merged.xlsx")
-df['Average for Week Ending'] = pd.to_datetime(df['Average for Week Ending']).dt.date
-merged_clean = df.dropna(subset=['Average for Week Ending', 'Deviation CTSGSGD', 'Deviation GSSGSGD'])
-df_full = pd.read_excel("df.xlsx")
-df_full['Average for Week Ending'] = pd.to_datetime(df_full['Average for Week Ending']).dt.date
-#overall tracking errors
-tracking_error_cts = round(np.std(merged_clean['Deviation CTSGSGD']), 6)
-tracking_error_gss = round(np.std(merged_clean['Deviation GSSGSGD']), 6)
-
-
-#comparisom plot
- 
-fig_comparison = go.Figure()
-
-# Official Index line
-fig_comparison.add_trace(go.Scatter(
-    x=df_full['Average for Week Ending'],
-    y=df_full['Official'],
-    mode='lines',
-    name='Official Index'
-))
-
-#GSSGSGD  
-fig_comparison.add_trace(go.Scatter(
-    x=df_full['Average for Week Ending'],
-    y=df_full['GSSGSGD'],
-    mode='lines',
-    name='GSSGSGD Index'
-))
-
-#add CTSGSGD  
-fig_comparison.add_trace(go.Scatter(
-    x=df_full['Average for Week Ending'],
-    y=df_full['CTSGSGD'],
-    mode='lines',
-    name='CTSGSGD Index'
-))
-
-fig_comparison.update_layout(
-    title='Comparison of Official Index and Custom Indices (GSSGSGD, CTSGSGD)',
-    xaxis_title='Date',
-    yaxis_title='Index Value',
-    legend_title='Index',
-    template='plotly_white',
-    xaxis=dict(tickangle=45),
-    height=600
-)
-
-#OLS
-X = df[['USD', 'EUR', 'JPY', 'CNY','MYR','IDR']]
-X = sm.add_constant(X)  # Constant for the intercept
-
-#OLS for CT
-y_cts = df['Deviation CTSGSGD']
-model_cts = sm.OLS(y_cts, X).fit()
-
-#OLS GS
-y_gss = df['Deviation GSSGSGD']
-model_gss = sm.OLS(y_gss, X).fit()
-
-app.layout = html.Div([
-    html.H1("SGDNEER Tracking Analysis", style={'text-align': 'center', 'font-family': 'Arial', 'color': '#003366'}),
-    html.P("This dashboard analyzes the performance of custom indices developed by Citi and Goldman in tracking the official Singapore Dollar Nominal Effective Exchange Rate (SGD NEER) published by Monetary Authority of Singapore (MAS). The SGD NEER is a key monetary policy tool that measures the value of the SGD against a basket of currencies. While the official index is published weekly and its weightage is undisclosed, the custom indices are updated daily, providing higher-frequency insights into currency movements and exchange rate trends."
-            ,  style={'font-family': 'Arial'}),
-    html.P("Accurate tracking thus becomes important as it supports economic analysis, risk management, and decision-making for market participants. Understanding the discrepancies is essential for improving the accuracy and usability of the custom indices."
-            ,  style={'font-family': 'Arial'}),
-    html.P("This study evaluates the tracking performance of the custom indices using key metrics such as deviation (the difference in returns between the indices) and tracking error (the volatility of these differences over time). It also examines potential factors causing tracking errors, such as weightage differences, policy changes, and data collections. "
-            ,  style={'font-family': 'Arial'}),
-    # Tracking dataframe 
-    html.Div([
-        html.H3("Index Tracking:", style={'font-family': 'Arial', 'color': '#003366'}),
+import dash_table
+from dash.dependencies import Input, Output, State
+import flask
+
+import downsample
+import index_registry
+import bootstrap
+import ingest
+import metrics
+import table_query
+import tracking_error as te
+from dashboard_data import DashboardData
+
+REFRESH_INTERVAL_MS = 10000
+TABLE_PAGE_SIZE = 20
+BOOTSTRAP_POLL_MS = 1000
+
+
+def ctx_triggered(prop_id):
+    """Whether prop_id is among the inputs that triggered the running callback."""
+    return any(t['prop_id'] == prop_id for t in dash.callback_context.triggered)
+
+
+def sync(data, version):
+    """
+    Catch data up with version, the data version the browser last saw. With several workers
+    another worker may have picked up ingested rows first; refresh is cheap when there are none.
+    """
+    if version is not None and version != str(data.version):
+        data.refresh()
+
+
+def build_layout(data):
+    """Page layout for the indices and tracking errors in data."""
+    return html.Div([
+        #data version, bumped when ingested rows arrive so open dashboards redraw without a restart
+        dcc.Store(id='data-version', data=str(data.version)),
+        dcc.Interval(id='refresh-interval', interval=REFRESH_INTERVAL_MS),
+        html.H1("SGDNEER Tracking Analysis", style={'text-align': 'center', 'font-family': 'Arial', 'color': '#003366'}),
+        html.P("This dashboard analyzes the performance of custom indices developed by Citi and Goldman in tracking the official Singapore Dollar Nominal Effective Exchange Rate (SGD NEER) published by Monetary Authority of Singapore (MAS). The SGD NEER is a key monetary policy tool that measures the value of the SGD against a basket of currencies. While the official index is published weekly and its weightage is undisclosed, the custom indices are updated daily, providing higher-frequency insights into currency movements and exchange rate trends."
+                ,  style={'font-family': 'Arial'}),
+        html.P("Accurate tracking thus becomes important as it supports economic analysis, risk management, and decision-making for market participants. Understanding the discrepancies is essential for improving the accuracy and usability of the custom indices."
+                ,  style={'font-family': 'Arial'}),
+        html.P("This study evaluates the tracking performance of the custom indices using key metrics such as deviation (the difference in returns between the indices) and tracking error (the volatility of these differences over time). It also examines potential factors causing tracking errors, such as weightage differences, policy changes, and data collections. "
+                ,  style={'font-family': 'Arial'}),
+        # Tracking dataframe 
+        html.Div([
+            html.H3("Index Tracking:", style={'font-family': 'Arial', 'color': '#003366'}),
         
-        # Tracking Table
+            # Tracking Table, rows are served a page at a time by update_tracking_table
+            html.Div([
+                dash_table.DataTable(
+                    id='tracking-table',
+                    columns=[{'name': col, 'id': col} for col in data.table_columns],
+                    page_current=0,
+                    page_size=TABLE_PAGE_SIZE,
+                    page_action='custom',
+                    sort_action='custom',
+                    sort_mode='single',
+                    sort_by=[],
+                    filter_action='custom',
+                    filter_query='',
+                    style_table={'margin': '20px 0', 'overflowY': 'auto', 'maxHeight': '400px'},
+                    style_cell={'padding': '10px', 'text-align': 'center', 'font-family': 'Arial', 'border': '1px solid #ddd'},
+                    style_header={'fontWeight': 'bold'},
+                )
+            ]),
+
+            #Comparison Plot Section
+            html.H3(f"Comparison of the Official MAS SGD NEER with the {' and '.join(data.level_indices)} indices."),
+            dcc.Graph(id='comparison-plot'),
+            html.P("Although this chart shows that the GS index consistently underestimates the actual index values while the Citi index tends to overestimate them most of the time, the nominal difference between the actual index and the tracked indices is less critical. What matters more is tracking the deviation in index returns, as this reflects how accurately the custom indices capture the relative movements or changes in the underlying SGD NEER over time. Focusing on the deviation in returns provides insights into whether the indices are effectively capturing trend alignments and short-term fluctuations, which are crucial for risk management, economic analysis, and decision-making. Even if the absolute level of the indices differs, as long as the custom indices move in tandem with the official index, they remain useful for tracking directional trends and analyzing market dynamics. This aspect of the analysis will be explored in detail below.",style={'font-family': 'Arial'}),
+        ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
+
+        #dropdown to select index
         html.Div([
-            html.Table([
-             
-                html.Tr([
-                    html.Th(col, style={'padding': '10px', 'text-align': 'center'}) 
-                    for col in ['Average for Week Ending', 'Official', 'CTSGSGD', 'GSSGSGD']
-                ]),  
-                
-    
-                *[html.Tr([
-                    html.Td(row[col], style={'padding': '10px', 'text-align': 'center'}) 
-                    for col in ['Average for Week Ending', 'Official', 'CTSGSGD', 'GSSGSGD']
-                ]) for index, row in df_full.iterrows()]  
-            ], style={
-                'width': '100%',
-                'border': '1px solid #ddd',
-                'border-collapse': 'collapse',
-                'margin': '20px 0',
-                'font-family': 'Arial',
-                'overflowY': 'auto',
-                'maxHeight': '400px',
-                'display': 'block'
-            })
-        ]),
-
-        #Comparison Plot Section
-        html.H3("Comparison of the Official MAS SGD NEER with the GSSGSGD and CTSGSGD indices."),
-        dcc.Graph(
-            id='comparison-plot',
-            figure=fig_comparison
-        ),
-        html.P("Although this chart shows that the GS index consistently underestimates the actual index values while the Citi index tends to overestimate them most of the time, the nominal difference between the actual index and the tracked indices is less critical. What matters more is tracking the deviation in index returns, as this reflects how accurately the custom indices capture the relative movements or changes in the underlying SGD NEER over time. Focusing on the deviation in returns provides insights into whether the indices are effectively capturing trend alignments and short-term fluctuations, which are crucial for risk management, economic analysis, and decision-making. Even if the absolute level of the indices differs, as long as the custom indices move in tandem with the official index, they remain useful for tracking directional trends and analyzing market dynamics. This aspect of the analysis will be explored in detail below.",style={'font-family': 'Arial'}),
-    ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
-
-    #dropdown to select index
-    html.Div([
-        html.Label('Select Index:', style={'font-family': 'Arial', 'color': '#003366'}),
-        dcc.Dropdown(
-            id='deviation-dropdown',
-            options=[
-                {'label': 'CTSGSGD', 'value': 'CTSGSGD'},
-                {'label': 'GSSGSGD', 'value': 'GSSGSGD'}
-            ],
-            value='CTSGSGD',   
-            style={'width': '50%', 'margin': '10px'}
-        ),
-    ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
-
-    #OLS summaries
-    html.Div([
-        html.H3("Weightage Difference between Indices:", style={'font-family': 'Arial', 'color': '#003366'}),
-        html.P("Since the exact weightings of the currencies in both indices are unknown, an OLS regression can help identify whether there are differences in how the indices respond to currency fluctuations. It can reveal if certain currencies play a key role in explaining the discrepancies between the custom and official indices. If there is a mismatch between the weightage of custom index and official index, the difference in indices should be more sensitive to a particular currency and the coefficient for that currency in the regression would likely be larger or more significant. By analyzing the coefficients and statistical significance, currencies that have the most influence on the deviation between the indices can be identified, potentially highlighting differences in how the indices are constructed or updated.."
-        , style={'font-family': 'Arial'}),
-        html.P("Dependent variable : Deviation between official index returns and Custom index returns"
-        , style={'font-family': 'Arial'}),
-        html.P("Independent variable: Currency returns (USD, EUR, JPY, CNY, etc.)."
-        , style={'font-family': 'Arial'}),
-        html.Pre(id='ols-summary', style={'font-family': 'Courier New', 'background-color': '#f9f9f9', 'padding': '15px', 'border': '1px solid #ddd'}),
-        html.Div(id='ols-comment', style={'font-family': 'Arial', 'color': '#003366', 'margin-top': '10px', 'white-space': 'pre-line'}),
-    ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
+            html.Label('Select Index:', style={'font-family': 'Arial', 'color': '#003366'}),
+            dcc.Dropdown(
+                id='deviation-dropdown',
+                options=[{'label': name, 'value': name} for name in data.indices],
+                value=data.indices[0],
+                clearable=False,
+                style={'width': '50%', 'margin': '10px'}
+            ),
+        ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
+
+        #OLS summaries
+        html.Div([
+            html.H3("Weightage Difference between Indices:", style={'font-family': 'Arial', 'color': '#003366'}),
+            html.P("Since the exact weightings of the currencies in both indices are unknown, an OLS regression can help identify whether there are differences in how the indices respond to currency fluctuations. It can reveal if certain currencies play a key role in explaining the discrepancies between the custom and official indices. If there is a mismatch between the weightage of custom index and official index, the difference in indices should be more sensitive to a particular currency and the coefficient for that currency in the regression would likely be larger or more significant. By analyzing the coefficients and statistical significance, currencies that have the most influence on the deviation between the indices can be identified, potentially highlighting differences in how the indices are constructed or updated.."
+            , style={'font-family': 'Arial'}),
+            html.P("Dependent variable : Deviation between official index returns and Custom index returns"
+            , style={'font-family': 'Arial'}),
+            html.P("Independent variable: Currency returns (USD, EUR, JPY, CNY, etc.)."
+            , style={'font-family': 'Arial'}),
+            html.Div([
+                html.Pre(id='ols-summary', style={'font-family': 'Courier New', 'background-color': '#f9f9f9', 'padding': '15px', 'border': '1px solid #ddd', 'flex': '1', 'overflowX': 'auto'}),
+                #coefficient paths show when a sensitivity started or reversed, which the full-sample fit hides
+                html.Div([
+                    html.Label('Regression window:', style={'font-family': 'Arial', 'color': '#003366'}),
+                    dcc.Dropdown(
+                        id='ols-window-dropdown',
+                        options=[
+                            {'label': 'Rolling 26 observations', 'value': 26},
+                            {'label': 'Rolling 52 observations', 'value': 52},
+                            {'label': 'Rolling 104 observations', 'value': 104},
+                            {'label': 'Expanding', 'value': 'expanding'}
+                        ],
+                        value=52,
+                        clearable=False,
+                        style={'width': '60%', 'margin': '10px'}
+                    ),
+                    dcc.Graph(id='ols-coef-plot'),
+                    dcc.Graph(id='ols-tstat-plot'),
+                ], style={'flex': '1'}),
+            ], style={'display': 'flex', 'gap': '20px'}),
+            html.Div(id='ols-comment', style={'font-family': 'Arial', 'color': '#003366', 'margin-top': '10px', 'white-space': 'pre-line'}),
+        ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
+
+        #Implied basket weights
+        html.Div([
+            html.H3("Implied Basket Weights:", style={'font-family': 'Arial', 'color': '#003366'}),
+            html.P("Instead of inferring weightage differences from the deviation regression, the basket weights of each index can be estimated directly: the index log-returns are regressed on the currency log-returns with the weights constrained to be non-negative and to sum to one, over rolling windows. Comparing the implied weights of a custom index with those of the official index measures the weight mismatch over time."
+            , style={'font-family': 'Arial'}),
+            html.Label('Estimation window:', style={'font-family': 'Arial', 'color': '#003366'}),
+            dcc.Dropdown(
+                id='weights-window-dropdown',
+                options=[
+                    {'label': 'Rolling 26 observations', 'value': 26},
+                    {'label': 'Rolling 52 observations', 'value': 52},
+                    {'label': 'Rolling 104 observations', 'value': 104}
+                ],
+                value=52,
+                clearable=False,
+                style={'width': '50%', 'margin': '10px'}
+            ),
+            html.Div([
+                dcc.Graph(id='official-weights-plot', style={'flex': '1'}),
+                dcc.Graph(id='index-weights-plot', style={'flex': '1'}),
+            ], style={'display': 'flex', 'gap': '20px'}),
+            dcc.Graph(id='weights-gap-plot'),
+        ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
     
-    # Deviation plot
-    html.Div([
-        html.H3("Deviation:", style={'font-family': 'Arial', 'color': '#003366'}),
-        dcc.Graph(id='interactive-plot'),
-        html.Div(id='deviation-comment', style={'font-family': 'Arial', 'color': '#003366', 'margin-top': '10px', 'white-space': 'pre-line'}),
-    ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
+        # Deviation plot
+        html.Div([
+            html.H3("Deviation:", style={'font-family': 'Arial', 'color': '#003366'}),
+            dcc.Graph(id='interactive-plot'),
+            html.Div(id='deviation-comment', style={'font-family': 'Arial', 'color': '#003366', 'margin-top': '10px', 'white-space': 'pre-line'}),
+        ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
 
     
-    #Tracking error plot
-    html.Div([
-        html.H3("Tracking Errors:", style={'font-family': 'Arial', 'color': '#003366'}),
-        dcc.Graph(id='monthly-tracking-error-plot'),
-        html.P(id='tracking-error', children=f"Tracking Error over the whole period for CTSGSGD: {tracking_error_cts:.6f}", style={'font-family': 'Arial'}),
-        html.Div(id='tracking-error-comment', style={'font-family': 'Arial', 'color': '#003366', 'margin-top': '10px', 'white-space': 'pre-line'}),
-    ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
-
-
-    #Conclusion
-    html.Div([
-        html.H3("Conclusion:", style={'font-family': 'Arial', 'color': '#003366'}),
-        html.Div(id='conclusion', style={'font-family': 'Arial', 'color': '#003366', 'margin-top': '10px', 'white-space': 'pre-line'}),
-    ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
-
-
-])
-
-#callback to update the interactive plot, tracking error, and OLS summary based on dropdown selection
-@app.callback(
-    [Output('interactive-plot', 'figure'),
-     Output('tracking-error', 'children'),
-     Output('ols-summary', 'children'),
-     Output('monthly-tracking-error-plot', 'figure'),
-     Output('deviation-comment', 'children'),
-     Output('tracking-error-comment', 'children'),
-     Output('ols-comment', 'children'),
-     Output('conclusion', 'children')],
-    [Input('deviation-dropdown', 'value')]
-)
-def update_content(selected_deviation):
-    """
-    This function updates the content based on the selected deviation index (CTSGSGD or GSSGSGD).
-    The content includes:
-    - Deviation Plot for the selected index
-    - Tracking Error for the selected index (including monthly tracking error)
-    - OLS regression summary for the selected index
-    -conclusion of each index
+        #Tracking error plot
+        html.Div([
+            html.H3("Tracking Errors:", style={'font-family': 'Arial', 'color': '#003366'}),
+            html.Label('Window:', style={'font-family': 'Arial', 'color': '#003366'}),
+            dcc.Dropdown(
+                id='tracking-window-dropdown',
+                options=[{'label': label, 'value': window} for window, label in te.WINDOWS.items()],
+                value='M',
+                clearable=False,
+                style={'width': '50%', 'margin': '10px'}
+            ),
+            dcc.Graph(id='tracking-error-plot'),
+            html.P(id='tracking-error', children=data.tracking_error_label(data.indices[0]), style={'font-family': 'Arial'}),
+            html.Div(id='tracking-error-comment', style={'font-family': 'Arial', 'color': '#003366', 'margin-top': '10px', 'white-space': 'pre-line'}),
+        ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
+
+
+        #Bootstrap confidence intervals, computed in the background and shown once ready
+        html.Div([
+            html.H3("Confidence Intervals:", style={'font-family': 'Arial', 'color': '#003366'}),
+            html.P("The tracking error and the OLS coefficients above are point estimates. Their uncertainty is estimated by a moving-block bootstrap: the deviation series is resampled in blocks of consecutive observations, which keeps its autocorrelation, and the tracking error and the regression are recomputed on every resample. The intervals appear below once the resampling has finished."
+            , style={'font-family': 'Arial'}),
+            dcc.Interval(id='bootstrap-interval', interval=BOOTSTRAP_POLL_MS),
+            html.P(id='bootstrap-status', style={'font-family': 'Arial', 'white-space': 'pre-line'}),
+            dcc.Graph(id='bootstrap-plot'),
+        ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
+
+
+        #Conclusion
+        html.Div([
+            html.H3("Conclusion:", style={'font-family': 'Arial', 'color': '#003366'}),
+            html.Div(id='conclusion', style={'font-family': 'Arial', 'color': '#003366', 'margin-top': '10px', 'white-space': 'pre-line'}),
+        ], style={'padding': '20px', 'background-color': '#f4f4f9'}),
+
+
+    ])
+
+
+def register_callbacks(app, data):
+    """Register the dashboard callbacks on app, all reading from data."""
+    #callback to update the interactive plot, tracking error, and OLS summary based on dropdown selection
+    @app.callback(
+        [Output('tracking-error', 'children'),
+         Output('ols-summary', 'children'),
+         Output('tracking-error-plot', 'figure'),
+         Output('deviation-comment', 'children'),
+         Output('tracking-error-comment', 'children'),
+         Output('ols-comment', 'children'),
+         Output('conclusion', 'children')],
+        [Input('deviation-dropdown', 'value'),
+         Input('tracking-window-dropdown', 'value'),
+         Input('data-version', 'data')]
+    )
+    @metrics.callback('update_content')
+    def update_content(selected_deviation, tracking_window='M', version=None):
+        """
+        This function updates the content based on the selected deviation index (any index in index_registry found in the data).
+        The content includes:
+        - Tracking Error for the selected index (including tracking error over the selected window)
+        - OLS regression summary for the selected index
+        -conclusion of each index
     
-    The data used for plotting and regression is cleaned and preprocessed data of currency indices.
-    """
+        The data used for plotting and regression is cleaned and preprocessed data of currency indices.
+        """
+        sync(data, version)
     
-    if selected_deviation == 'CTSGSGD':
-        y_data = merged_clean['Deviation CTSGSGD']
-        tracking_error = tracking_error_cts
-        ols_summary = model_cts.summary().as_text()
-        name = 'CTSGSGD'
-        deviation_comment = """
-        *Deviation is calculated by the difference between Official index return and Custom index return ,i.e. official index return - custom index return
-        This provides an insight into a more spotaneous performance in discrepancy between the two indices on a weekly basis.
-        
-        Most data points are close to zero, with in the band of +-0.1%, indicating the Citi index generally tracks the MAS NEER well over time. The error fluctuate around zero, implies that Citi index is unbiased in its tracking as it does not systematically deviate in one direction
-        The constant small noise could be due to differences in data source, sampling timing etc. Each index may rely on different sources of data or even different methodologies to interpret the data. For example, one index might use spot exchange rates while another might use forward exchange rates or trade-weighted averages. These different approaches to data collection and calculation can contribute to constant discrepancies between the indices
-        
-        Obervations:
-        1. Deviation in May 2022
-        Both the Citi and Goldman indices experienced significant deviations in May 2022, suggesting a common external factor or structural shift affecting both indices simultaneously. One possible explanation could be MAS Policy Shift.In April 2022, MAS tightened its monetary policy by increasing the slope of the SGD NEER policy band to allow for a faster appreciation of the SGD, aimed at combating inflation. Such a policy shift could include adjustments in the official SGD NEER, which the custom indices (Citi and Goldman) may have struggled to immediately replicate.
-        Another guess would be sensitivity to USD Fluctuations. Since the OLS regression for the Citi index showed that USD returns have a significant positive coefficient (0.1413, p = 0.003), indicating that deviations are highly sensitive to USD movements. In May 2022, the USD was appreciating rapidly due to the Fed’s aggressive rate hikes, causing the SGD NEER to behave differently than expected. If the Citi index underestimated the USD relative to the official index, this could explain the spike in deviations.
-        
-        2. Sharp Peak and Trough in November 2022
-        On November 2, 2022, the Federal Reserve announced its fourth consecutive 75 basis point interest rate increase, raising the federal funds rate to a target range of 3.75% to 4%. USD peaked after a prolonged period of strength, then began to decline as markets anticipated a potential slowdown in Fed rate hikes.The volatility in USD could be contributing to the changes in index
+        name = selected_deviation
+        tracking_error = data.tracking_errors[name]
+        comments = index_registry.commentary(name, tracking_error, data.ols_fit)
 
-        3. Trough on March 24, 2023
-        March 2023 saw significant financial market stress due to the collapse of Silicon Valley Bank (SVB) and concerns about Credit Suisse, which led to heightened risk aversion and safe-haven flows into the USD. The sudden appreciation of the USD likely caused fluctuations
-        """
+        results = data.index_results.get(name)
+        error_results = data.tracking_results.get(name, tracking_window)
 
-        tracking_error_comment = """
-        Tracking error is calculated as the standard deviation of the difference between the official, Tracking Error=std(Official Index Return - Custom Index Return)
-        This metric measures the volatility or variability of the differences between the returns of the official index and the custom index, rather than just the direct differences (deviation) at each point in time. 
-        A lower tracking error indicates that the custom index closely and consistently tracks the official index, making it a more reliable tool for tracking purposes.
-        
-        The average tracking error over the period from Jan 2022 to Dec 2024 is relatively low at 0.000632, indicating that the Citi-tracked index generally follows the official MAS SGD NEER index closely with minimal long-term deviation and it could be a reliable tool to use for tracking.
-        
-        However, there are periods of increased tracking error, the spikes in tracking error in May 2022 and Dec 2022 period suggesting that the custom index may lag in adjusting to changes in the official MAS SGD NEER, following similar reasons in Deviaiton plot
-        
-        There is a upward trend in tracking error toward the end of 2024, which could signal the need to monitor the index more closely and potentially revise its methodology or rebalancing process to maintain tracking accuracy
+        return data.tracking_error_label(name), results['ols_summary'], error_results['tracking_error_fig'], comments['deviation_comment'], comments['tracking_error_comment'], comments['ols_comment'], comments['conclusion']
 
 
+    #callback to update the rolling/expanding OLS coefficient and t-stat paths
+    @app.callback(
+        [Output('ols-coef-plot', 'figure'),
+         Output('ols-tstat-plot', 'figure')],
+        [Input('deviation-dropdown', 'value'),
+         Input('ols-window-dropdown', 'value'),
+         Input('data-version', 'data')]
+    )
+    @metrics.callback('update_ols_paths')
+    def update_ols_paths(selected_deviation, ols_window, version=None):
         """
-        ols_comment = """
-        From the OLS summary, it can be seen that coefficient for USD is 0.1413 (p-value = 0.003) and it is significant. It indicates that deviations between the indices are sensitive to fluctuations in the USD. As the coefficient is positive, it means that when that currency’s return increases, the official index return exceeds the custom index return, resulting in positive deviation. This could be an indication that citi index underestimated the weightage of USD
-        
-        The IDR coefficient (-0.0651), though smaller, is notable due to its marginal significance. This could indicate that the IDR also plays a secondary role in contributing to the deviations.
-        
-        Other currencies like EUR, JPY, CNY, and MYR do not appear to significantly influence the deviations, suggesting that their weights or impacts are more closely aligned between the two indices.
-        
-        *Currencies with high correlation due to central bank policies and regional trade linkages are omitted to avoid high multicollinearity: HKD, TWD, KRW, THB, IDR, and PHP
+        This function updates the coefficient and t-stat time-series of the deviation regression
+        for the selected index, over rolling windows of the selected length or an expanding window.
         """
-
-        conclusion = """
-        The Citi-tracked index demonstrates strong overall performance in tracking the official MAS SGD NEER index. Most deviations are close to zero and fluctuate around zero, indicating that the Citi index is unbiased in its tracking and the tracking error over the period from January 2022 to December 2024 is relatively low at 0.0632%, reflecting a high degree of consistency and reliability in tracking the official index over the long term.
-        
-        However, small but consistent noise in the deviations can be attributed to differences in data sources, sampling timing, or data collection methodologies between the indices. The analysis also suggests that the Citi index may have underestimated the weightage of the USD, as spikes in deviation and volatility appear to coincide with periods of heightened USD fluctuations.
-        
-        To further improve the analysis, it will be more beneficial to have more detailed information about the custom index. For example, knowing the exact weights of the currencies in the custom index would allow a more precise understanding of how currency movements influence the deviations and knowing when and how the index rebalances its weights could also clarify spikes in tracking error
-
-        Another improvement would be to understand how the formula of indices are constructed. The current analysis assumes the index is a linear combination of exchange rates. However, if the index is constructed differently (e.g., as a product of exchange rates or includes non-linear transformations), this assumption may not hold.In such cases, analyzing deviations might require transformations like natural logarithms or other forms of data manipulation to better reflect the relationship between the indices.
+        sync(data, version)
+        window = None if ols_window == 'expanding' else int(ols_window)
+        results = data.ols_path_results.get(selected_deviation, window)
+        return results['coef_fig'], results['tstat_fig']
+
+
+    #callback to update the implied basket weight paths of the official and the selected index
+    @app.callback(
+        [Output('official-weights-plot', 'figure'),
+         Output('index-weights-plot', 'figure'),
+         Output('weights-gap-plot', 'figure')],
+        [Input('deviation-dropdown', 'value'),
+         Input('weights-window-dropdown', 'value'),
+         Input('data-version', 'data')]
+    )
+    @metrics.callback('update_basket_weights')
+    def update_basket_weights(selected_deviation, weights_window, version=None):
         """
-        
+        This function updates the implied basket weights of the official index and the selected
+        index over rolling windows of the selected length, and the difference between them.
+        """
+        sync(data, version)
+        official = data.basket_weight_results.get(index_registry.OFFICIAL_COLUMN, weights_window)
+        results = data.basket_weight_results.get(selected_deviation, weights_window)
+        return official['weights_fig'], results['weights_fig'], results['gap_fig']
+
+
+    #callback to serve one page of the tracking table, sorted and filtered server-side
+    @app.callback(
+        [Output('tracking-table', 'data'),
+         Output('tracking-table', 'page_count')],
+        [Input('tracking-table', 'page_current'),
+         Input('tracking-table', 'page_size'),
+         Input('tracking-table', 'sort_by'),
+         Input('tracking-table', 'filter_query'),
+         Input('data-version', 'data')]
+    )
+    @metrics.callback('update_tracking_table')
+    def update_tracking_table(page_current, page_size, sort_by, filter_query, version=None):
+        """
+        This function returns the rows of the tracking table visible on the current page,
+        after applying the sort and filter chosen in the table.
+        """
+        sync(data, version)
+        return table_query.query_page(data.table_frame, page_current, page_size, sort_by, filter_query)
+
+
+    #callback to show the bootstrap intervals of the selected index, polling until the background job is done
+    @app.callback(
+        [Output('bootstrap-status', 'children'),
+         Output('bootstrap-plot', 'figure'),
+         Output('bootstrap-interval', 'disabled')],
+        [Input('deviation-dropdown', 'value'),
+         Input('data-version', 'data'),
+         Input('bootstrap-interval', 'n_intervals')]
+    )
+    @metrics.callback('update_bootstrap')
+    def update_bootstrap(selected_deviation, version=None, n_intervals=None):
+        """
+        This function submits the bootstrap of the selected index if it is not running yet and
+        reports its progress, then shows the confidence intervals once it has finished.
+        """
+        sync(data, version)
+        job = data.bootstrap(selected_deviation)
+        if job.state == 'failed':
+            return f"Bootstrap for {selected_deviation} failed, it is retried when the index is selected again.", {}, True
+        if job.state == 'running':
+            #only clear the previous index's chart when the selection changed, not on every poll
+            figure = dash.no_update if ctx_triggered('bootstrap-interval.n_intervals') else {}
+            return f"Bootstrap for {selected_deviation} running: {job.progress:.0%} of {bootstrap.N_BOOT} resamples done.", figure, False
+
+        result = job.result
+        te_ci = result['tracking_error']
+        lines = [
+            f"Tracking Error: {te_ci['estimate']:.6f} ({1 - bootstrap.ALPHA:.0%} CI {te_ci['low']:.6f} - {te_ci['high']:.6f})",
+        ]
+        if 'USD' in result['params'].index:
+            usd = result['params'].loc['USD']
+            lines.append(f"USD coefficient: {usd['estimate']:.4f} ({1 - bootstrap.ALPHA:.0%} CI {usd['low']:.4f} - {usd['high']:.4f}, bootstrap p-value {usd['p_value']:.3f})")
+        lines.append(f"From {result['n_boot']} block-bootstrap resamples with blocks of {result['block']} observations.")
+        return '\n'.join(lines), data.build_bootstrap_figure(selected_deviation, result), True
+
+
+    #callback to pick up ingested rows, the new version triggers the callbacks above
+    @app.callback(
+        Output('data-version', 'data'),
+        [Input('refresh-interval', 'n_intervals')],
+        [State('data-version', 'data')]
+    )
+    @metrics.callback('check_for_updates')
+    def check_for_updates(n_intervals, current_version):
+        """
+        This function folds newly ingested rows into the data and bumps the data version
+        when there were any, so the open dashboard redraws.
+        """
+        version = str(data.refresh())
+        return dash.no_update if version == current_version else version
 
-    else:
-        y_data = merged_clean['Deviation GSSGSGD']
-        tracking_error = tracking_error_gss
-        ols_summary = model_gss.summary().as_text()
-        name = 'GSSGSGD'
-        deviation_comment = """
-        *Deviation is calculated by the difference between Official index return and Custom index return ,i.e. official index return - custom index return
-        This provides an insight into a more spotaneous performance in discrepancy between the two indices on a weekly basis.
-        
-        Most data points are close to zero, with in the band of +-0.1%, indicating the index generally tracks the MAS NEER well over time. The error fluctuate around zero, implies that index is unbiased in its tracking as it does not systematically deviate in one direction
-        The constant small noise could be due to differences in data source, sampling timing etc. Each index may rely on different sources of data or even different methodologies to interpret the data. For example, one index might use spot exchange rates while another might use forward exchange rates or trade-weighted averages. These different approaches to data collection and calculation can contribute to constant discrepancies between the indices
-        
-        Obervations:
-        1. Deviation in May 2022
-        Both the Citi and Goldman indices experienced significant deviations in May 2022, suggesting a common external factor or structural shift affecting both indices simultaneously. One possible explanation could be MAS Policy Shift.In April 2022, MAS tightened its monetary policy by increasing the slope of the SGD NEER policy band to allow for a faster appreciation of the SGD, aimed at combating inflation. Such a policy shift could include adjustments in the official SGD NEER, which the custom indices (Citi and Goldman) may have struggled to immediately replicate.
-        2. Peaks in April and September 2024
-        The cause of the deviations observed on April 5-12, 2024, and September 27, 2024, is unclear. However, it is evident that these deviations are not driven by USD fluctuations, as the Citi index, despite also having a significant USD weightage difference, does not exhibit similar fluctuations during these periods.
 
+    #callbacks to redraw the comparison and deviation plots, at full resolution for the visible range when zoomed
+    @app.callback(
+        Output('comparison-plot', 'figure'),
+        [Input('data-version', 'data'),
+         Input('comparison-plot', 'relayoutData')]
+    )
+    @metrics.callback('update_comparison')
+    def update_comparison(version, relayout_data):
         """
-        tracking_error_comment = """
-        Tracking error for GSSGSGD is calculated as the standard deviation of the difference between the official, Tracking Error=std(Official Index Return - Custom Index Return)
-        This metric measures the volatility or variability of the differences between the returns of the official index and the custom index, rather than just the direct differences (deviation) at each point in time. 
-        A lower tracking error indicates that the custom index closely and consistently tracks the official index, making it a more reliable tool for tracking purposes.
-        
-        The tracking error chart for GSSGSGD shows that the Goldman index generally tracks the MAS SGD NEER closely, with a low overall tracking error of 0.0578%. This indicates strong alignment between the two indices under normal conditions and coud be a reliable tool to be used for tracking.
-
-        However, notable spikes in tracking error occur in May and Dec 2022 due to similar reasons in Citi index, and in Apr 2024, Sep 2024, and Dec 2024, likely caused by external factors such as methodology rebalancing 
-        
+        This function returns the comparison plot for the whole history from the cache, or
+        rebuilt from the full-resolution data for the visible range after a zoom.
+        """
+        sync(data, version)
+        x_range = downsample.visible_range(relayout_data) if ctx_triggered('comparison-plot.relayoutData') else None
+        if x_range is None:
+            return data.comparison_results.get()
+        return data.build_comparison_figure(x_range)
+
+
+    @app.callback(
+        Output('interactive-plot', 'figure'),
+        [Input('deviation-dropdown', 'value'),
+         Input('data-version', 'data'),
+         Input('interactive-plot', 'relayoutData')]
+    )
+    @metrics.callback('update_deviation_plot')
+    def update_deviation_plot(selected_deviation, version, relayout_data):
         """
-        ols_comment = """
-        R-squared value of 0.068 means that only 6.8 percent of the variance in the deviations is explained by the currency returns. This suggests that the model captures only a small portion of the factors driving the deviations, and other unmodeled factors (e.g., methodology differences, data sources, or rebalancing frequency) may play a larger role.
+        This function returns the deviation plot of the selected index, from the cache for the
+        whole history or rebuilt for the visible range after a zoom.
+        """
+        sync(data, version)
+        x_range = downsample.visible_range(relayout_data) if ctx_triggered('interactive-plot.relayoutData') else None
+        if x_range is None:
+            return data.index_results.get(selected_deviation)['deviation_fig']
+        return data.build_deviation_figure(selected_deviation, x_range)
 
-        The USD has a negative coefficient (-0.0781) and is marginally significant at the 10 percent level, meaning that when the USD strengthens (i.e., its returns increase), the Goldman index return is likely higher than the official return, implying an overestimation of weighting in USD
 
-        *Currencies with high correlation due to central bank policies and regional trade linkages are omitted to avoid high multicollinearity: HKD, TWD, KRW, THB, IDR, and PHP
-        """
-        conclusion = """
-        The GS index demonstrates strong overall performance in tracking the official MAS SGD NEER index. Most deviations are close to zero and fluctuate around zero, indicating that the GS index is unbiased in its tracking and the tracking error over the period from January 2022 to December 2024 is relatively low at 0.0578% (lower than Citi index), reflecting a high degree of consistency and reliability in tracking the official index over the long term.
-        
-        However, small but consistent noise in the deviations can be attributed to differences in data sources, sampling timing, or data collection methodologies between the indices. The analysis also suggests that the GS index may have overestimated the weightage of the USD, as spikes in deviation and volatility appear to coincide with periods of heightened USD fluctuations.
-        
-        To further improve the analysis, it will be more beneficial to have more detailed information about the custom index. For example, knowing the exact weights of the currencies in the custom index would allow a more precise understanding of how currency movements influence the deviations and knowing when and how the index rebalances its weights could also clarify whether spikes in tracking error
+def create_app(data=None, warm='background'):
+    """
+    Build the dashboard around data (a DashboardData, loaded here if None).
 
-        Another improvement would be to understand how the formula of indices are constructed. The current analysis assumes the index is a linear combination of exchange rates. However, if the index is constructed differently (e.g., as a product of exchange rates or includes non-linear transformations), this assumption may not hold.In such cases, analyzing deviations might require transformations like natural logarithms or other forms of data manipulation to better reflect the relationship between the indices.
-        """
+    warm: 'background' fills the result caches for the first index now and the rest in a
+    background thread, 'all' fills them all before returning (used before forking workers
+    so they share the warmed caches), None leaves them to the first requests.
+    """
+    data = data or DashboardData()
+    if warm == 'all':
+        data.warm()
+    elif warm == 'background':
+        data.warm(data.indices[:1])
+        threading.Thread(target=data.warm, args=(data.indices[1:],), daemon=True).start()
 
-    #monthly tracking error dynamically based on selected deviation
-    merged_clean['Month'] = pd.to_datetime(merged_clean['Average for Week Ending']).dt.to_period('M')
-    monthly_error = merged_clean.groupby('Month').apply(lambda x: np.std(x[f'Deviation {name}']))
-    monthly_error = monthly_error.reset_index(name=f'Tracking Error - {name}')
-    
-    #  deviation plot
-    deviation_fig = go.Figure()
-    deviation_fig.add_trace(go.Scatter(
-        x=merged_clean['Average for Week Ending'], 
-        y=merged_clean[f'Deviation {name}'], 
-        mode='lines', 
-        name=f'{name} Deviation'
-    ))
-    deviation_fig.update_layout(
-        title=f'Deviation for {name}',
-        xaxis_title='Date',
-        yaxis_title='Deviation'
-    )
-    
-    #monthly tracking error plot
-    monthly_error_fig = go.Figure()
-    monthly_error_fig.add_trace(go.Bar(
-        x=monthly_error['Month'].astype(str),
-        y=monthly_error[f'Tracking Error - {name}'],
-        name=f'Monthly Tracking Error - {name}'
-    ))
-    monthly_error_fig.update_layout(
-        title=f'Monthly Tracking Error for {name}',
-        xaxis_title='Month',
-        yaxis_title='Tracking Error'
-    )
+    app = dash.Dash(__name__)
+    app.layout = build_layout(data)
+    register_callbacks(app, data)
+
+    #health endpoint for load balancers and process managers
+    @app.server.route('/healthz')
+    def healthz():
+        return flask.jsonify(data.health())
+
+    #/metrics in Prometheus text format, request timings and optional profiling, see metrics.py
+    metrics.register_collector('dashboard', data.collect_metrics)
+    metrics.register_collector('jobs', data.bootstrap_jobs.collect_metrics)
+    metrics.init_app(app.server)
 
-    return deviation_fig, f"Tracking Error from May 2022 - Dec 2024: {tracking_error}", ols_summary, monthly_error_fig, deviation_comment, tracking_error_comment, ols_comment, conclusion
+    return app
 
 
 if __name__ == '__main__':
-    app.run_server(debug=True, port = '8051')
+    #optional drop folder for new observations, see ingest.py; the reloader runs the app in a
+    #child process with WERKZEUG_RUN_MAIN set, only that one should watch
+    if os.environ.get('SGDNEER_DROP_FOLDER') and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        ingest.DropFolderWatcher(os.environ['SGDNEER_DROP_FOLDER']).start()
+    #development server, see wsgi.py for serving with multiple workers
+    create_app().run_server(debug=True, port = '8051')
@@ -0,0 +1,88 @@
+"""
+Server-side paging, sorting and filtering for the "Index Tracking" table.
+
+The table runs with page_action/sort_action/filter_action='custom', so the browser
+only sends its page, sort_by and filter_query and receives the visible rows.
+Filters use the DataTable query syntax, e.g. {Official} > 120 && {Average for Week Ending} >= 2023-01-01
+"""
+import pandas as pd
+
+OPERATORS = [
+    ['ge ', '>='],
+    ['le ', '<='],
+    ['lt ', '<'],
+    ['gt ', '>'],
+    ['ne ', '!='],
+    ['eq ', '='],
+    ['contains '],
+    ['datestartswith '],
+]
+
+
+def split_filter_part(filter_part):
+    """
+    Split one '{column} op value' clause into (column, operator, value). The value is the
+    string as typed, unquoted; filter_frame decides whether it is a number.
+    """
+    # the operator is looked up after the column name, names such as 'Average for ...' contain 'ge '
+    name_end = filter_part.rfind('}')
+    name = filter_part[filter_part.find('{') + 1: name_end]
+    rest = filter_part[name_end + 1:].lstrip()
+    for operator_type in OPERATORS:
+        for operator in operator_type:
+            if not rest.startswith(operator):
+                continue
+            value_part = rest[len(operator):].strip()
+            v0 = value_part[0] if value_part else ''
+            if v0 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                value = value_part[1:-1].replace('\\' + v0, v0)
+            else:
+                value = value_part
+
+            # word operators need spaces after them in the filter string,
+            # but we don't want these later
+            return name, operator_type[0].strip(), value
+    return None, None, None
+
+
+def filter_frame(frame, filter_query):
+    """Apply a DataTable filter_query to frame."""
+    if not filter_query:
+        return frame
+    for filter_part in filter_query.split(' && '):
+        col_name, operator, filter_value = split_filter_part(filter_part)
+        if col_name not in frame.columns:
+            continue
+        column = frame[col_name]
+        if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
+            #numbers only for numeric columns, other columns compare the text as typed ('2023', not '2023.0')
+            if pd.api.types.is_numeric_dtype(column):
+                try:
+                    filter_value = float(filter_value)
+                except ValueError:
+                    continue
+            frame = frame.loc[getattr(column, operator)(filter_value)]
+        elif operator == 'contains':
+            frame = frame.loc[column.astype(str).str.contains(filter_value, regex=False)]
+        elif operator == 'datestartswith':
+            frame = frame.loc[column.astype(str).str.startswith(filter_value)]
+    return frame
+
+
+def query_page(frame, page_current, page_size, sort_by=None, filter_query=''):
+    """
+    Filter, sort and slice frame for one table page.
+
+    Returns (records for the page, number of pages after filtering).
+    """
+    frame = filter_frame(frame, filter_query)
+    if sort_by:
+        frame = frame.sort_values(
+            [col['column_id'] for col in sort_by],
+            ascending=[col['direction'] == 'asc' for col in sort_by],
+            inplace=False
+        )
+    page_current = page_current or 0
+    page_count = max(1, -(-len(frame) // page_size))
+    start = page_current * page_size
+    return frame.iloc[start:start + page_size].to_dict('records'), page_count
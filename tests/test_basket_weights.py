@@ -0,0 +1,93 @@
+"""Simplex-constrained implied basket weights."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import basket_weights  # noqa: E402
+import jobs  # noqa: E402
+
+DATE = 'Average for Week Ending'
+CURRENCIES = ['USD', 'EUR', 'JPY', 'MYR', 'CNY']
+
+
+def reference_projection(v):
+    u = np.sort(v)[::-1]
+    css = np.cumsum(u) - 1.0
+    rho = np.nonzero(u - css / np.arange(1, len(v) + 1) > 0)[0][-1]
+    return np.maximum(v - css[rho] / (rho + 1), 0.0)
+
+
+@pytest.fixture
+def returns():
+    """Weekly currency log-returns and two indices built from them with known weights."""
+    rng = np.random.default_rng(11)
+    n = 200
+    X = rng.normal(scale=0.01, size=(n, len(CURRENCIES)))
+    true = {'AAASGD': rng.dirichlet(np.ones(len(CURRENCIES))), 'BBBSGD': np.array([0.5, 0.0, 0.3, 0.2, 0.0])}
+    frame = pd.DataFrame(X, columns=CURRENCIES)
+    frame.insert(0, DATE, pd.date_range('2020-01-03', periods=n, freq='W-FRI'))
+    for name, w in true.items():
+        frame[name] = 1e-4 + X @ w + rng.normal(scale=1e-6, size=n)
+    return frame, true
+
+
+def test_project_simplex_matches_reference():
+    rng = np.random.default_rng(0)
+    v = rng.normal(scale=2.0, size=(50, 6, 3))
+    projected = basket_weights.project_simplex(v)
+    expected = np.stack([np.stack([reference_projection(v[i, :, j]) for j in range(3)], axis=1) for i in range(50)])
+    np.testing.assert_allclose(projected, expected, atol=1e-12)
+
+
+def test_implied_weights_recover_known_weights(returns):
+    frame, true = returns
+    weights = basket_weights.implied_weights(frame, list(true), CURRENCIES, window=52, processes=1)
+    for name, w in true.items():
+        path = weights[name]
+        assert len(path) == len(frame) - 52 + 1
+        assert path.index[-1] == frame[DATE].iloc[-1]
+        assert (path.to_numpy() >= 0).all()
+        np.testing.assert_allclose(path.sum(axis=1), 1.0, atol=1e-9)
+        np.testing.assert_allclose(path.to_numpy(), np.broadcast_to(w, path.shape), atol=1e-3)
+
+
+def test_gap_in_one_index_leaves_the_other_alone(returns):
+    frame, true = returns
+    full = basket_weights.implied_weights(frame, list(true), CURRENCIES, window=52, processes=1)
+    gapped = frame.copy()
+    gapped.loc[100:104, 'BBBSGD'] = np.nan
+    weights = basket_weights.implied_weights(gapped, list(true), CURRENCIES, window=52, processes=1)
+    pd.testing.assert_frame_equal(weights['AAASGD'], full['AAASGD'])
+    assert len(weights['BBBSGD']) == len(full['BBBSGD']) - 5
+    np.testing.assert_allclose(weights['BBBSGD'].to_numpy(), np.broadcast_to(true['BBBSGD'], weights['BBBSGD'].shape), atol=1e-3)
+
+
+def test_solve_batch_leaves_non_finite_windows_nan(returns):
+    frame, true = returns
+    gram, xty = basket_weights.rolling_statistics(frame[CURRENCIES].to_numpy(), frame[list(true)].to_numpy(), 52)
+    gram[3, 0, 0] = np.nan
+    weights = basket_weights.solve_batch(gram, xty)
+    assert np.isnan(weights[3]).all()
+    assert np.isfinite(np.delete(weights, 3, axis=0)).all()
+
+
+def test_short_history_gives_no_windows(returns):
+    frame, true = returns
+    weights = basket_weights.implied_weights(frame.head(20), list(true), CURRENCIES, window=52, processes=1)
+    assert all(path.empty and list(path.columns) == CURRENCIES for path in weights.values())
+
+
+def test_pool_matches_serial(returns, monkeypatch):
+    frame, true = returns
+    gram, xty = basket_weights.rolling_statistics(frame[CURRENCIES].to_numpy(), frame[list(true)].to_numpy(), 52)
+    monkeypatch.setattr(basket_weights, 'PARALLEL_MIN_WINDOWS', 1)
+    try:
+        pooled = basket_weights.solve_windows(gram, xty, processes=2, batch_size=40)
+    finally:
+        jobs.shutdown_pools()
+    np.testing.assert_array_equal(pooled, basket_weights.solve_batch(gram, xty))
@@ -0,0 +1,72 @@
+"""LTTB downsampling and the zoom-aware line traces built on it."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import downsample  # noqa: E402
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(3)
+    x = pd.date_range('2015-01-01', periods=5000, freq='D').to_numpy()
+    y = np.cumsum(rng.normal(size=5000))
+    y[1234] += 500.0
+    return x, y
+
+
+def test_lttb_keeps_ends_and_spikes(series):
+    x, y = series
+    kept = downsample.lttb_indices((x - x[0]).astype('int64').astype(float), y, 500)
+    assert len(kept) == 500
+    assert kept[0] == 0 and kept[-1] == len(y) - 1
+    assert (np.diff(kept) > 0).all()
+    assert 1234 in kept
+
+
+def test_lttb_short_series_is_kept_whole():
+    assert list(downsample.lttb_indices(np.arange(5.0), np.arange(5.0), 10)) == list(range(5))
+
+
+@pytest.mark.parametrize('order', ['descending', 'shuffled'])
+def test_line_trace_does_not_depend_on_row_order(series, order):
+    x, y = series
+    index = np.arange(len(x))[::-1] if order == 'descending' else np.random.default_rng(0).permutation(len(x))
+    expected = downsample.line_trace(x, y, 'a', max_points=1000)
+    trace = downsample.line_trace(x[index], y[index], 'a', max_points=1000)
+    np.testing.assert_array_equal(trace.x, expected.x)
+    np.testing.assert_array_equal(trace.y, expected.y)
+
+
+def test_zoom_on_descending_dates(series):
+    x, y = series
+    x_range = (np.datetime64('2020-01-01'), np.datetime64('2020-03-01'))
+    trace = downsample.line_trace(x[::-1], y[::-1], 'a', x_range=x_range)
+    #the 61 days in range at full resolution, plus one point either side
+    assert len(trace.x) == 63
+    assert isinstance(trace, go.Scatter)
+
+
+def test_line_trace_drops_missing_points_and_switches_to_webgl(series):
+    x, y = series
+    y = y.copy()
+    y[::10] = np.nan
+    x = x.copy()
+    x[5] = np.datetime64('NaT')
+    trace = downsample.line_trace(x, y, 'a', max_points=10000)
+    assert len(trace.x) == len(x) - len(x) // 10 - 1
+    assert isinstance(trace, go.Scattergl)
+
+
+def test_visible_range():
+    assert downsample.visible_range(None) is None
+    assert downsample.visible_range({'xaxis.autorange': True}) is None
+    assert downsample.visible_range({'xaxis.range[0]': '2020-01-01', 'xaxis.range[1]': '2020-02-01 12:00'}) == (
+        np.datetime64('2020-01-01T00:00:00.000000000'), np.datetime64('2020-02-01T12:00:00.000000000'),
+    )
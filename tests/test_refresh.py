@@ -0,0 +1,130 @@
+"""
+Rows ingested into a running dashboard are folded into its running statistics (Welford
+moments, OLS sufficient statistics); the result has to match loading everything afresh.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import data_store  # noqa: E402
+import ingest  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+from dashboard_data import DashboardData  # noqa: E402
+
+N_BASE = 80
+
+
+def write_workbooks(directory, currency_merged, df_full):
+    directory.mkdir(exist_ok=True)
+    paths = str(directory / 'currency_merged.xlsx'), str(directory / 'df.xlsx')
+    currency_merged.to_excel(paths[0], index=False)
+    df_full.to_excel(paths[1], index=False)
+    return paths
+
+
+@pytest.fixture
+def frames(tmp_path, monkeypatch):
+    """Full synthetic inputs, the last index without a deviation column, and their currencies."""
+    monkeypatch.setattr(data_store, 'CACHE_DIR', str(tmp_path / 'cache'))
+    currency_merged, df_full = synthetic.generate(years=2, n_currencies=5, n_indices=3, freq='W')
+    #the last index has no deviation column, it is derived from its levels
+    derived = f'Deviation {synthetic.index_names(3)[-1]}'
+    currency_merged = currency_merged.drop(columns=[derived])
+    #a gap in one index must not affect the others
+    currency_merged.loc[[10, 95], f'Deviation {synthetic.index_names(3)[0]}'] = np.nan
+    return currency_merged, df_full, synthetic.currency_names(5)
+
+
+@pytest.fixture
+def inputs(tmp_path, frames):
+    """Base workbooks with the first N_BASE rows, the rest returned for appending."""
+    currency_merged, df_full, currencies = frames
+    paths = write_workbooks(tmp_path / 'base', currency_merged.iloc[:N_BASE], df_full.iloc[:N_BASE])
+    return paths, currency_merged.iloc[N_BASE:], df_full.iloc[N_BASE:], currencies
+
+
+def assert_same_statistics(data, fresh):
+    assert data.indices == fresh.indices
+    np.testing.assert_allclose(data.tracking_moments.std(), fresh.tracking_moments.std(), rtol=1e-10)
+    assert data.tracking_errors == pytest.approx(fresh.tracking_errors, abs=1e-12)
+    for key in ('params', 'bse'):
+        np.testing.assert_allclose(data.ols_fit[key].to_numpy(), fresh.ols_fit[key].to_numpy(), rtol=1e-8, atol=1e-12)
+    pd.testing.assert_series_equal(data.ols_fit['nobs'], fresh.ols_fit['nobs'], check_dtype=False)
+
+
+def test_refresh_matches_full_load(inputs):
+    (currency_file, index_file), new_df, new_full, currencies = inputs
+    data = DashboardData(currency_file, index_file, currencies)
+    assert data.derived_columns
+
+    #index levels can arrive before the currency rows they belong to
+    ingest.append_rows(index_file, new_full.iloc[:20])
+    data.refresh()
+    ingest.append_rows(currency_file, new_df)
+    ingest.append_rows(index_file, new_full.iloc[20:])
+    version = data.refresh()
+
+    fresh = DashboardData(currency_file, index_file, currencies)
+    assert version == fresh.version
+    assert len(data.df) == len(fresh.df)
+    assert_same_statistics(data, fresh)
+
+
+def test_back_dated_rows_match_full_load(tmp_path, frames):
+    currency_merged, df_full, currencies = frames
+    #a week missing from the base workbooks arrives late, it changes the derived deviation of the week after
+    date = currency_merged[data_store.DATE_COLUMN].iloc[40]
+    late_currency = currency_merged[data_store.DATE_COLUMN] == date
+    late_index = df_full[data_store.DATE_COLUMN] == date
+    currency_file, index_file = write_workbooks(tmp_path / 'base', currency_merged[~late_currency], df_full[~late_index])
+    data = DashboardData(currency_file, index_file, currencies)
+
+    ingest.append_rows(index_file, df_full[late_index])
+    ingest.append_rows(currency_file, currency_merged[late_currency])
+    data.refresh()
+
+    assert_same_statistics(data, DashboardData(*write_workbooks(tmp_path / 'full', currency_merged, df_full), currencies))
+    assert_same_statistics(data, DashboardData(currency_file, index_file, currencies))
+
+
+def test_late_official_print_completes_its_week(tmp_path, frames):
+    currency_merged, df_full, currencies = frames
+    currency_file, index_file = write_workbooks(tmp_path / 'base', currency_merged.iloc[:N_BASE], df_full.iloc[:N_BASE + 1])
+    data = DashboardData(currency_file, index_file, currencies)
+    row = currency_merged.iloc[[N_BASE]]
+    official = ['Official', *(col for col in row.columns if col.startswith('Deviation '))]
+
+    #the custom index fixes of the week come first, the MAS print later
+    ingest.append_rows(currency_file, row.assign(**{col: np.nan for col in official}))
+    data.refresh()
+    ingest.append_rows(currency_file, row[[data_store.DATE_COLUMN, *official]])
+    data.refresh()
+
+    assert len(data.df) == N_BASE + 1
+    assert_same_statistics(data, DashboardData(*write_workbooks(tmp_path / 'full', currency_merged.iloc[:N_BASE + 1], df_full.iloc[:N_BASE + 1]), currencies))
+    assert_same_statistics(data, DashboardData(currency_file, index_file, currencies))
+
+
+def test_append_rows_drops_known_dates(inputs):
+    (currency_file, index_file), new_df, new_full, currencies = inputs
+    known = pd.read_excel(index_file).tail(3)
+    with pytest.raises(ValueError):
+        ingest.append_rows(index_file, known)
+    with pytest.raises(ValueError):
+        ingest.append_rows(index_file, known.assign(Official=known['Official'] + 1))
+
+    #a date already there, and one date twice in the same file: the later values of the new one win
+    rows = pd.concat([known.tail(1), new_full.head(1).assign(Official=0.0), new_full.head(1)])
+    ingest.append_rows(index_file, rows)
+    _, version = data_store.load_frame(index_file)
+    (chunk,) = data_store.load_appends(index_file, version)
+    assert len(chunk) == 1
+    assert chunk['Official'].iloc[0] == new_full['Official'].iloc[0]
+
+    data = DashboardData(currency_file, index_file, currencies)
+    assert len(data.df_full) == N_BASE + 1
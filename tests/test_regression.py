@@ -0,0 +1,80 @@
+"""OLS paths and fits against statsmodels on the same data."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+from statsmodels.regression.rolling import RollingOLS
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import regression  # noqa: E402
+
+DATE = 'Average for Week Ending'
+X_COLUMNS = ['USD', 'EUR', 'JPY']
+
+
+@pytest.fixture
+def frame():
+    """Weekly currency returns and two deviation series, the second with gaps."""
+    rng = np.random.default_rng(2)
+    n = 200
+    frame = pd.DataFrame(rng.normal(0, 4e-3, (n, 3)), columns=X_COLUMNS)
+    frame.insert(0, DATE, pd.date_range('2020-01-03', periods=n, freq='W-FRI'))
+    frame['Deviation A'] = frame[X_COLUMNS] @ [0.1, -0.05, 0.02] + rng.normal(0, 5e-4, n)
+    frame['Deviation B'] = frame[X_COLUMNS] @ [-0.08, 0.0, 0.03] + rng.normal(0, 5e-4, n)
+    frame.loc[[7, 60, 61, 150], 'Deviation B'] = np.nan
+    return frame
+
+
+def reference(frame, column, window, expanding=False, min_nobs=None):
+    rows = frame.dropna(subset=[column, *X_COLUMNS])
+    model = RollingOLS(rows[column], sm.add_constant(rows[X_COLUMNS]), window=window, expanding=expanding, min_nobs=min_nobs)
+    fit = model.fit()
+    params = fit.params.set_axis(rows[DATE]).dropna()
+    tvalues = fit.tvalues.set_axis(rows[DATE]).dropna()
+    return params, tvalues
+
+
+@pytest.mark.parametrize('column', ['Deviation A', 'Deviation B'])
+def test_rolling_paths_match_statsmodels(frame, column):
+    paths = regression.ols_paths(frame, ['Deviation A', 'Deviation B'], X_COLUMNS, window=52)[column]
+    params, tvalues = reference(frame, column, 52)
+    np.testing.assert_allclose(paths['params'].to_numpy(), params.to_numpy(), rtol=1e-8, atol=1e-12)
+    np.testing.assert_allclose(paths['tvalues'].to_numpy(), tvalues.to_numpy(), rtol=1e-8)
+    assert (paths['params'].index == params.index).all()
+
+
+@pytest.mark.parametrize('column', ['Deviation A', 'Deviation B'])
+def test_expanding_paths_match_statsmodels(frame, column):
+    paths = regression.ols_paths(frame, ['Deviation A', 'Deviation B'], X_COLUMNS, window=None, min_periods=26)[column]
+    params, tvalues = reference(frame, column, len(frame), expanding=True, min_nobs=26)
+    np.testing.assert_allclose(paths['params'].to_numpy(), params.to_numpy(), rtol=1e-8, atol=1e-12)
+    np.testing.assert_allclose(paths['tvalues'].to_numpy(), tvalues.to_numpy(), rtol=1e-8)
+    assert (paths['params'].index == params.index).all()
+
+
+def test_paths_do_not_depend_on_other_columns(frame):
+    alone = regression.ols_paths(frame, ['Deviation A'], X_COLUMNS, window=52)['Deviation A']['params']
+    batched = regression.ols_paths(frame, ['Deviation A', 'Deviation B'], X_COLUMNS, window=52)['Deviation A']['params']
+    pd.testing.assert_frame_equal(alone, batched)
+
+
+def test_fit_ols_and_accumulator_match_statsmodels(frame):
+    columns = ['Deviation A', 'Deviation B']
+    fit = regression.fit_ols(frame, columns, X_COLUMNS)
+    accumulator = regression.OLSAccumulator(columns, X_COLUMNS)
+    accumulator.update(frame.iloc[:100])
+    for i in range(100, len(frame)):
+        accumulator.update(frame.iloc[[i]])
+    streamed = accumulator.fit()
+    for column in columns:
+        rows = frame.dropna(subset=[column])
+        expected = sm.OLS(rows[column], sm.add_constant(rows[X_COLUMNS])).fit()
+        for result in (fit, streamed):
+            np.testing.assert_allclose(result['params'][column].to_numpy(), expected.params.to_numpy(), rtol=1e-8, atol=1e-12)
+            np.testing.assert_allclose(result['bse'][column].to_numpy(), expected.bse.to_numpy(), rtol=1e-6)
+            assert result['nobs'][column] == expected.nobs
+            assert result['rsquared'][column] == pytest.approx(expected.rsquared, rel=1e-8)
@@ -0,0 +1,62 @@
+"""Server-side filtering of the Index Tracking table."""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import table_query  # noqa: E402
+
+DATE = 'Average for Week Ending'
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({
+        DATE: ['2022-12-30', '2023-01-06', '2023-02-03', '2024-01-05'],
+        'Official': [118.2, 120.5, 121.0, 12.0],
+        'CTSGSGD': [100.0, 101.5, 99.0, 102.0],
+    })
+
+
+@pytest.mark.parametrize('clause, expected', [
+    #the column name contains 'ge ', the operator is only looked up after the closing brace
+    ('{Average for Week Ending} >= 2023-01-06', (DATE, 'ge', '2023-01-06')),
+    ('{Official} > 120', ('Official', 'gt', '120')),
+    ('{Official} gt 120', ('Official', 'gt', '120')),
+    ('{Official} = "120.5"', ('Official', 'eq', '120.5')),
+    ("{CTSGSGD} contains '101 5'", ('CTSGSGD', 'contains', '101 5')),
+    ('{Official} contains "say \\"hi\\""', ('Official', 'contains', 'say "hi"')),
+    ('{Average for Week Ending} datestartswith 2023', (DATE, 'datestartswith', '2023')),
+    ('{Official} is nonsense', (None, None, None)),
+])
+def test_split_filter_part(clause, expected):
+    assert table_query.split_filter_part(clause) == expected
+
+
+@pytest.mark.parametrize('query, rows', [
+    ('{Official} > 120', [1, 2]),
+    ('{Official} <= 12', [3]),
+    ('{Official} = "120.5"', [1]),
+    #a number for a string operator is matched as typed, not as '12.0'
+    ('{Official} contains 12', [1, 2, 3]),
+    ('{Official} contains 120', [1]),
+    ('{Average for Week Ending} datestartswith 2023', [1, 2]),
+    ('{Average for Week Ending} >= 2023', [1, 2, 3]),
+    ('{Average for Week Ending} >= 2023-01-06 && {CTSGSGD} < 101', [2]),
+    #text against a numeric column cannot match anything, the clause is ignored
+    ('{Official} > abc', [0, 1, 2, 3]),
+    ('{Unknown} > 1', [0, 1, 2, 3]),
+])
+def test_filter_frame(table, query, rows):
+    assert list(table_query.filter_frame(table, query).index) == rows
+
+
+def test_query_page_counts_filtered_pages(table):
+    records, page_count = table_query.query_page(
+        table, 0, 1, sort_by=[{'column_id': 'Official', 'direction': 'desc'}], filter_query='{Official} > 100',
+    )
+    assert page_count == 3
+    assert records[0]['Official'] == 121.0
@@ -0,0 +1,53 @@
+"""The vectorized tracking-error engine against pandas groupby/rolling on the same data."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import tracking_error as te  # noqa: E402
+
+
+@pytest.fixture
+def deviations():
+    """Irregular business-day dates, three columns with scattered gaps."""
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range('2021-01-01', periods=400)[np.sort(rng.choice(400, 300, replace=False))]
+    values = rng.normal(0, 1e-3, (len(dates), 3)) + 5e-4
+    values[rng.random(values.shape) < 0.1] = np.nan
+    return pd.DataFrame(values, index=dates, columns=['a', 'b', 'c'])
+
+
+@pytest.mark.parametrize('freq', ['M', 'Q'])
+def test_bucket_std_matches_groupby(deviations, freq):
+    periods, std = te.bucket_std(deviations.index.to_numpy(), deviations.to_numpy(), freq)
+    expected = deviations.groupby(deviations.index.to_period(freq)).std(ddof=0)
+    assert list(periods) == list(expected.index)
+    np.testing.assert_allclose(std, expected.to_numpy(), rtol=1e-10, atol=1e-15)
+
+
+@pytest.mark.parametrize('window', ['91D', '13W', '4W'])
+def test_rolling_std_matches_pandas_rolling(deviations, window):
+    std = te.rolling_std(deviations.index.to_numpy(), deviations.to_numpy(), window)
+    offset = f'{int(window[:-1]) * 7}D' if window.endswith('W') else window
+    expected = deviations.rolling(offset, min_periods=2).std(ddof=0)
+    np.testing.assert_allclose(std, expected.to_numpy(), rtol=1e-8, atol=1e-15)
+
+
+def test_streaming_moments_match_np_std(deviations):
+    moments = te.StreamingMoments(deviations.columns)
+    for start in range(0, len(deviations), 37):
+        moments.update(deviations.iloc[start:start + 37])
+    np.testing.assert_allclose(moments.std(), deviations.std(ddof=0).to_numpy(), rtol=1e-12)
+
+
+def test_tracking_error_frame_sorts_by_date(deviations):
+    frame = deviations.rename_axis('Average for Week Ending').reset_index()
+    shuffled = frame.sample(frac=1, random_state=0)
+    pd.testing.assert_frame_equal(
+        te.tracking_error_frame(shuffled, ['a', 'b'], '13W'),
+        te.tracking_error_frame(frame, ['a', 'b'], '13W'),
+    )
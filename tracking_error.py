@@ -0,0 +1,151 @@
+"""
+Vectorized tracking-error engine.
+
+Tracking error is the population standard deviation (ddof=0, as np.std) of the
+deviation series. Calendar buckets (monthly, quarterly) are computed with one
+bincount over all columns, rolling N-day / N-week windows with cumulative sums of
+x and x**2, so every column and every window is handled in a single pass without
+a Python-level call per group. StreamingMoments keeps the overall tracking error
+current as new rows are ingested.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+#window options offered in the dashboard, calendar buckets by pandas period code, rolling windows as N[DW]
+WINDOWS = {
+    'M': 'Monthly',
+    'Q': 'Quarterly',
+    '4W': 'Rolling 4-week',
+    '13W': 'Rolling 13-week',
+    '26W': 'Rolling 26-week',
+    '52W': 'Rolling 52-week',
+}
+CALENDAR_WINDOWS = ('M', 'Q')
+
+
+def _parse_rolling(window):
+    match = re.fullmatch(r'(\d+)([DW])', window)
+    if match is None:
+        raise ValueError(f'Unknown tracking error window: {window!r}')
+    days = int(match.group(1)) * (7 if match.group(2) == 'W' else 1)
+    return np.timedelta64(days, 'D')
+
+
+def _centered(values):
+    """Subtract the column means so the sum-of-squares formulas do not lose precision."""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    mask = ~np.isnan(values)
+    means = np.nanmean(values, axis=0) if mask.any() else np.zeros(values.shape[1])
+    return np.where(mask, values - means, 0.0), mask
+
+
+def _std(count, total, total_sq, min_periods):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        var = np.maximum(total_sq / count - mean * mean, 0.0)
+    return np.where(count >= min_periods, np.sqrt(var), np.nan)
+
+
+def bucket_std(dates, values, freq='M', min_periods=1):
+    """
+    Standard deviation of each column of values within calendar buckets of dates.
+
+    dates: datetime64 array of length n
+    values: array of shape (n,) or (n, m), NaNs are ignored
+    freq: pandas period code, e.g. 'M' or 'Q'
+
+    Returns (periods, std) with one row of std per non-empty period.
+    """
+    x, mask = _centered(values)
+    n, m = x.shape
+    codes, periods = pd.factorize(pd.DatetimeIndex(dates).to_period(freq), sort=True)
+    b = len(periods)
+
+    #one bincount over (bucket, column) pairs instead of a loop over groups
+    flat = (codes[:, None] * m + np.arange(m)).ravel()
+    count = np.bincount(flat, weights=mask.ravel(), minlength=b * m).reshape(b, m)
+    total = np.bincount(flat, weights=x.ravel(), minlength=b * m).reshape(b, m)
+    total_sq = np.bincount(flat, weights=(x * x).ravel(), minlength=b * m).reshape(b, m)
+    return periods, _std(count, total, total_sq, min_periods)
+
+
+def rolling_std(dates, values, window, min_periods=2):
+    """
+    Standard deviation of each column of values over the trailing time window
+    (t - window, t] ending at every observation. dates must be sorted.
+
+    window: np.timedelta64 or a string such as '13W' or '90D'
+    """
+    if isinstance(window, str):
+        window = _parse_rolling(window)
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    x, mask = _centered(values)
+    start = np.searchsorted(dates, dates - window, side='right')
+    end = np.arange(1, len(dates) + 1)
+
+    def windowed(a):
+        cum = np.concatenate([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+        return cum[end] - cum[start]
+
+    return _std(windowed(mask.astype(float)), windowed(x), windowed(x * x), min_periods)
+
+
+def tracking_error_frame(frame, columns, window='M', date_column='Average for Week Ending'):
+    """
+    Tracking error of the given deviation columns of frame for one entry of WINDOWS.
+
+    Calendar windows return one row per period (index of period strings), rolling windows
+    one row per observation (index of dates).
+    """
+    frame = frame.sort_values(date_column)
+    dates = frame[date_column].to_numpy()
+    values = frame[list(columns)].to_numpy(dtype=float)
+    if window in CALENDAR_WINDOWS:
+        periods, std = bucket_std(dates, values, window)
+        index = pd.Index(periods.astype(str), name='Period')
+    else:
+        std = rolling_std(dates, values, window)
+        index = pd.Index(dates, name=date_column)
+    return pd.DataFrame(std, index=index, columns=list(columns))
+
+
+class StreamingMoments:
+    """
+    Running count, mean and sum of squared deviations of each column (Welford), so the
+    overall tracking error can be refreshed from new rows only. Batches are merged with
+    Chan's parallel update, which is Welford's update applied to a block of rows.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.count = np.zeros(len(self.columns))
+        self.mean = np.zeros(len(self.columns))
+        self.m2 = np.zeros(len(self.columns))
+
+    def update(self, values):
+        """Add rows of values, shape (n, len(columns)); NaNs are skipped per column."""
+        values = np.asarray(values, dtype=float).reshape(-1, len(self.columns))
+        mask = ~np.isnan(values)
+        count = mask.sum(axis=0)
+        if not count.any():
+            return
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.nansum(values, axis=0) / count, 0.0)
+        m2 = np.where(mask, values - mean, 0.0)
+        m2 = (m2 * m2).sum(axis=0)
+
+        total = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            self.m2 = self.m2 + m2 + np.where(total > 0, delta * delta * self.count * count / total, 0.0)
+        self.count = total
+
+    def std(self):
+        """Population standard deviation of each column, as np.std."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, np.sqrt(self.m2 / self.count), np.nan)
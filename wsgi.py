@@ -0,0 +1,26 @@
+"""
+WSGI entry point for serving the dashboard with several worker processes:
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+The data is loaded, the models fitted and every result cache warmed at import. With
+preload_app (see gunicorn.conf.py) that happens once in the master, and the workers
+forked from it share all of it copy-on-write instead of each parsing and fitting its own.
+"""
+import gc
+
+import jobs
+import metrics
+from sgdneer_app import create_app
+
+app = create_app(warm='all')
+server = app.server
+
+#startup metrics are written once from the master, the workers forked from it report only what they add
+metrics.flush()
+#a pool started while warming belongs to the master, each worker starts its own
+jobs.shutdown_pools()
+
+#objects loaded so far are moved out of the garbage collector's reach, otherwise the first
+#collection in each worker touches every object header and unshares the pages
+gc.freeze()